@@ -6,6 +6,8 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import numpy as np
+
 from .tools import remap
 
 class Bbox(object):
@@ -36,18 +38,18 @@ class Bbox(object):
 
 
     def setFromPoints(self, points):
-        self.min_x, self.min_y = float("inf"), float("inf")
-        self.max_x, self.max_y = float("-inf"), float("-inf")
-        for x, y in points:            # Set min coords
-            if x < self.min_x:
-                self.min_x = x
-            if y < self.min_y:
-                self.min_y = y
-            # Set max coords
-            if x > self.max_x:
-                self.max_x = x
-            elif y > self.max_y:
-                self.max_y = y
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if points.shape[0] == 0:
+            self.min_x, self.min_y = float("inf"), float("inf")
+            self.max_x, self.max_y = float("-inf"), float("-inf")
+        else:
+            self.min_x, self.min_y = points.min(axis=0).tolist()
+            self.max_x, self.max_y = points.max(axis=0).tolist()
+
+
+    def setFromLimits(self, limits):
+        self.min_x, self.min_y, self.max_x, self.max_y = limits
+        return self
 
 
     def join(self, other):
@@ -10,7 +10,7 @@ import math
 import numpy as np
 
 from .Element import Element
-from .tools import remap, distance, pointInside
+from .tools import remap, distance, pointInside, pointsInside
 
 class Circle(Element):
     def __init__( self, center, radius, **kwargs ):
@@ -53,6 +53,16 @@ class Circle(Element):
             return pointInside( pos, self.getPoints() )
 
 
+    def contains( self, points ):
+        if self.radius[0] == self.radius[1] and self.open_angle == 0:
+            points = np.asarray(points, dtype=float).reshape(-1, 2)
+            dx = points[:, 0] - self.center[0]
+            dy = points[:, 1] - self.center[1]
+            return np.sqrt( dx * dx + dy * dy ) < self.radius[0]
+        else:
+            return pointsInside( points, self.getPoints() )
+
+
 
     def getPointPct(self, t):
         if t > 1.0 or t < 0.0:
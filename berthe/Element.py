@@ -6,14 +6,73 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import math
+import weakref
 import numpy as np
 
 from .Bbox import Bbox
-from .tools import pointInside, hex2fill
+from .Matrix import Matrix
+from .tools import pointInside, pointsInside, hex2fill, pack_path, hatch_path
+
+def _tellOwner(value):
+    owner = value._owner() if getattr(value, '_owner', None) is not None else None
+    if owner is not None:
+        owner._dropBounds()
+
+
+class _TrackedList(list):
+    # List given as translate/scale, tells its element when it's edited in place
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        _tellOwner(self)
+
+
+class _TrackedArray(np.ndarray):
+    # Array given as translate/scale, tells its element when it's edited in place
+    def __array_finalize__(self, obj):
+        self._owner = None
+
+    def __setitem__(self, index, value):
+        np.ndarray.__setitem__(self, index, value)
+        _tellOwner(self)
+
+    def __iadd__(self, other):
+        result = np.ndarray.__iadd__(self, other)
+        _tellOwner(self)
+        return result
+
+    def __isub__(self, other):
+        result = np.ndarray.__isub__(self, other)
+        _tellOwner(self)
+        return result
+
+    def __imul__(self, other):
+        result = np.ndarray.__imul__(self, other)
+        _tellOwner(self)
+        return result
+
+    def __itruediv__(self, other):
+        result = np.ndarray.__itruediv__(self, other)
+        _tellOwner(self)
+        return result
+
+
+def _track(value, owner):
+    if isinstance(value, np.ndarray):
+        value = np.array(value).view(_TrackedArray)
+    elif type(value) is list or isinstance(value, _TrackedList):
+        value = _TrackedList(value)
+    else:
+        return value
+    value._owner = weakref.ref(owner)
+    return value
+
 
 class Element(object):
+    # Attributes that can change without changing the geometry (bookkeeping and caches)
+    _uncached = ('parent', '_index', '_path_cache')
+
     def __init__(self, **kwargs):
+        self._path_cache = None
         self.head_width = kwargs.pop('head_width', 0.2)
         self.id = kwargs.pop('id', None)
 
@@ -26,6 +85,8 @@ class Element(object):
         if isinstance(self.fill, str):
             if self.fill.lower() == "none":
                 self.fill = False
+            elif self.fill.lower() == "hatch":
+                self.fill = "hatch"
             else:
                 self.fill = hex2fill(self.fill)
 
@@ -34,25 +95,75 @@ class Element(object):
         self.scale = kwargs.pop('scale', 1.0)
         self.parent = None
         self.color = kwargs.pop('color', 'black')
-        
+
+
+    def __setattr__(self, name, value):
+        # Any change on the attributes makes the geometry cached by getPath() (and the bounds) stale
+        if name in ('translate', 'scale'):
+            # and so does editing them in place (ex: el.translate[0] += 10)
+            value = _track(value, self)
+
+        if name not in self._uncached:
+            cache = self.__dict__.get('_path_cache')
+            self.__dict__['_path_cache'] = None
+            if cache is not None and self.__dict__.get('parent') is not None:
+                self.parent._dropBounds(self)
+        object.__setattr__(self, name, value)
+
+
+    def _dropBounds(self, child=None):
+        # The bounds of the groups this element is in (see Group.bounds) depend on it
+        if self._path_cache is not None:
+            self._path_cache = None
+            if self.parent is not None:
+                self.parent._dropBounds(self)
+
+
     @property
     def isTransformed(self):
         return self.translate[0] != 0.0 or self.translate[1] != 0.0 or self.scale != 1.0 or self.rotate != 0.0
 
 
+    @property
+    def matrix(self):
+        return Matrix(translate=self.translate, rotate=self.rotate, scale=self.scale)
+
+
+    def _getBoundsKey(self):
+        # Same key as the geometry cached by getPath(), so edits in place that getPath() 
+        # notices also make the bounds stale
+        return ('bounds', self._getPathKey({}))
+
+
+    def _hasBounds(self):
+        return self._path_cache is not None and self._getBoundsKey() in self._path_cache
+
+
     @property
     def bounds(self):
-        return Bbox( points=self.getPoints() )
+        # Kept next to the cached geometry, so it goes away with it
+        key = self._getBoundsKey()
+        if self._path_cache is None or key not in self._path_cache:
+            limits = Bbox( points=self.getPoints() ).limits
+            if self._path_cache is None:
+                self._path_cache = {}
+            self._path_cache[key] = limits
+        return Bbox().setFromLimits( self._path_cache[key] )
 
 
     @property
     def center(self):
-        return bounds.center
+        return self.bounds.center
 
 
     def inside( self, pos ):
         return pointInside( pos, self.getPoints() )
 
+
+    def contains( self, points ):
+        """Batch version of inside() for a (N, 2) array of points. Returns a (N,) boolean array"""
+        return pointsInside( points, self.getPoints() )
+
     
     def getPoints(self):
         print('getPoints(): Function not declare')
@@ -82,29 +193,40 @@ class Element(object):
 
 
     def getTransformed(self, func):
+        # func can be a function func(x, y) -> (x, y) or a Matrix
         raise Exception('Not implemented for', type(self))
 
 
     def getTranslated(self, dx, dy):
-        def func(x, y):
-            return (x + dx, y + dy)
-        return self.getTransformed(func)
+        return self.getTransformed( Matrix().translate(dx, dy) )
 
 
     def getScaled(self, sx, sy=None):
-        if sy is None:
-            sy = sx
-        def func(x, y):
-            return (x * sx, y * sy)
-        return self.getTransformed(func)
+        return self.getTransformed( Matrix().scale(sx, sy) )
 
 
     def getRotated(self, angle):
-        c = math.cos(math.radians(angle))
-        s = math.sin(math.radians(angle))
-        def func(x, y):
-            return (x * c - y * s, y * c + x * s)
-        return self.getTransformed(func)
+        return self.getTransformed( Matrix().rotate(angle) )
+
+
+    def getMoved(self, x, y, ax, ay):
+        """Moves the element so the point at (ax, ay) of its bounds (0.0 - 1.0) lands on (x, y)"""
+        x1, y1, x2, y2 = self.bounds.limits
+        dx = x1 + (x2 - x1) * ax - x
+        dy = y1 + (y2 - y1) * ay - y
+        return self.getTranslated(-dx, -dy)
+
+
+    def getCentered(self, width, height):
+        return self.getMoved(width / 2, height / 2, 0.5, 0.5)
+
+
+    def getScaledToFit(self, width, height, padding=0):
+        width -= padding * 2
+        height -= padding * 2
+        bbox = self.bounds
+        scale = min(width / bbox.width, height / bbox.height)
+        return self.getScaled(scale, scale).getCentered(width, height)
 
 
     def getStrokePath(self, **kwargs ):
@@ -118,10 +240,60 @@ class Element(object):
         return Path([ self.getPoints() ], color=self.color)
 
 
+    def _getPathKey(self, kwargs):
+        scale = self.scale
+        if isinstance(scale, (tuple, list, np.ndarray)):
+            scale = tuple(np.ravel(scale).tolist())
+        return (tuple(np.ravel(self.translate).tolist()), self.rotate, scale,
+                self.stroke_width, self.head_width, self.fill, tuple(sorted(kwargs.items())))
+
+
+    def _getFillRings(self):
+        # Outlines enclosing the area to fill (the ones inside others are holes)
+        return [ self.getPoints() ]
+
+
+    def getHatchPath(self, **kwargs):
+        """Fills the element with parallel lines at `angle` degrees (0 is horizontal), 
+        `spacing` apart, drawn in zig-zag. Much faster than the concentric fill on large areas"""
+        from .Path import Path
+
+        head_width = kwargs.pop('head_width', self.head_width)
+        overlap = kwargs.pop('overlap', 0.15 )
+        angle = kwargs.pop('angle', 0.0)
+        spacing = kwargs.pop('spacing', head_width * (1 - overlap))
+
+        vertices, offsets = pack_path( self._getFillRings() )
+        vertices, offsets = hatch_path(vertices, offsets, spacing, angle, inset=head_width * 0.5)
+        return Path(vertices=vertices, offsets=offsets, head_width=head_width, color=self.color)
+
+
     def getPath(self, **kwargs):
+        """Returns the geometry of the element as a Path (treat it as read only). It's 
+        generated once per set of kwargs and kept until an attribute of the element changes. 
+        After editing an attribute in place (ex: a list of points) set `dirty = True`"""
+        try:
+            key = self._getPathKey(kwargs)
+            hash(key)
+        except TypeError:
+            return self._getPath(**kwargs)
+
+        if self._path_cache is not None and key in self._path_cache:
+            return self._path_cache[key]
+
+        path = self._getPath(**kwargs)
+        if self._path_cache is None:
+            self._path_cache = {}
+        self._path_cache[key] = path
+        return path
+
+
+    def _getPath(self, **kwargs):
         # # raise Exception('getPath(): Function not declare. Going with a simple convertion of the getPoints() to a Path')
         # from .Path import Path
-        if self.fill:
+        if self.fill == "hatch":
+            return self.getHatchPath(**kwargs)
+        elif self.fill:
             return self.getFillPath(**kwargs)
         else:
             return self.getStrokePath(**kwargs)
@@ -131,3 +303,7 @@ class Element(object):
         return self.getPath().getSVGElementString()
 
 
+    def writeSVGElement(self, file):
+        self.getPath().writeSVGElement(file)
+
+
@@ -6,6 +6,9 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import io
+
+from .Bbox import Bbox
 from .Element import Element
 
 from .Line import Line
@@ -17,11 +20,19 @@ from .Polyline import Polyline
 from .Polygon import Polygon
 from .Text import Text
 from .Path import Path
-from .Pattern import Pattern
+from .Matrix import Matrix
+from .RTree import RTree
 
 from .tools import dom2dict, parse_transform
 
+def _overlaps(a, b):
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
 class Group(Element):
+    # The spatial index of the elements is kept up to date by add() and by the elements themselves
+    _uncached = Element._uncached + ('_tree', '_touched')
+
     def __init__( self, id="Untitled", **kwargs ):
         Element.__init__(self, **kwargs);
 
@@ -29,6 +40,21 @@ class Group(Element):
         self.elements = []
         self.subgroups = { } 
 
+        # Affine transformation (Matrix) pending to be applied to all elements.
+        # It's only applied when the geometry is consumed (getPath, getPoints, SVG...)
+        self._matrix = None
+
+        # Groups made by getTransformed() share the elements of another group, which 
+        # only tell that one when they change, so they can't keep their bounds
+        self._shared = False
+
+        # R-tree over the bounds of the elements (built on the first query) as
+        # (tree, indexed list, indexed count, position of each element, positions 
+        # of subgroups that can't keep their bounds), plus the positions of the 
+        # elements that changed since it was built
+        self._tree = None
+        self._touched = set()
+
     def __iter__(self):
         self._index = 0
         return self
@@ -59,9 +85,110 @@ class Group(Element):
         self.elements.append(element)
         if isinstance(element, Group):
             self.subgroups[element.id] = element
+        self._dropBounds()
         return element
 
 
+    def _dropBounds(self, child=None):
+        if child is not None and self._tree is not None:
+            position = self._tree[3].get(id(child))
+            if position is not None:
+                self._touched.add(position)
+        Element._dropBounds(self, child)
+
+
+    def _getBoundsKey(self):
+        # The elements tell when they change (see _dropBounds)
+        return 'bounds'
+
+
+    def _getTree(self):
+        tree = self._tree
+        n = len(self.elements)
+
+        # The elements added since it was built or that changed are checked one by one,
+        # once there are too many of them it gets rebuilt
+        if tree is not None:
+            if tree[1] is not self.elements or tree[2] > n:
+                tree = None
+            elif n - tree[2] + len(self._touched) > max(64, tree[2] // 8):
+                tree = None
+
+        if tree is None:
+            boxes = [ el.bounds.limits for el in self.elements ]
+            volatile = set( i for i, el in enumerate(self.elements) 
+                            if isinstance(el, Group) and not el._hasBounds() )
+            positions = dict( (id(el), i) for i, el in enumerate(self.elements) )
+            tree = (RTree(boxes), self.elements, n, positions, volatile)
+            self._tree = tree
+            self._touched = set()
+
+        return tree
+
+
+    def elementsIn(self, bbox, deep=False):
+        """Returns the elements whose bounds overlap bbox (a Bbox or a (min_x, min_y, max_x, max_y)
+        tuple) in drawing order. With deep=True the subgroups found are replaced by their elements.
+        On rotated groups the query is done with the bounds of the (rotated back) box"""
+        limits = bbox.limits if isinstance(bbox, Bbox) else tuple(bbox)
+        if self._matrix is not None:
+            limits = self._matrix.inverse().applyToLimits(limits)
+
+        if self._shared:
+            found = [ i for i, el in enumerate(self.elements) if _overlaps(el.bounds.limits, limits) ]
+        else:
+            tree, elements, size, positions, volatile = self._getTree()
+            recheck = self._touched | volatile
+            found = [ i for i in tree.search(limits).tolist() if i not in recheck ]
+            for i in sorted(recheck) + list(range(size, len(self.elements))):
+                if _overlaps(self.elements[i].bounds.limits, limits):
+                    found.append(i)
+            found.sort()
+
+        result = []
+        for i in found:
+            el = self.elements[i]
+            if deep and isinstance(el, Group):
+                result.extend( el.elementsIn(limits, deep=True) )
+            else:
+                result.append( el )
+        return result
+
+
+    def elementsAt(self, point, deep=False):
+        """Returns the elements whose bounds contain the point"""
+        return self.elementsIn( (point[0], point[1], point[0], point[1]), deep )
+
+
+    @property
+    def bounds(self):
+        """Union of the bounds of the elements. Every group keeps its own until one of its 
+        elements changes, so together they work as a bounding volume hierarchy"""
+        if self._path_cache is not None and 'bounds' in self._path_cache:
+            return Bbox().setFromLimits( self._path_cache['bounds'] )
+
+        # Only cache when every subgroup is also caching (or changes below could be missed)
+        cacheable = not self._shared
+        bbox = Bbox()
+        for el in self.elements:
+            bbox.join( el.bounds )
+            if isinstance(el, Group) and not el._hasBounds():
+                cacheable = False
+        limits = bbox.limits
+
+        if self._matrix is not None:
+            if self._matrix.isAxisAligned:
+                limits = self._matrix.applyToLimits(limits)
+            else:
+                limits = self.getPath().bounds.limits
+
+        if cacheable:
+            if self._path_cache is None:
+                self._path_cache = {}
+            self._path_cache['bounds'] = limits
+        return Bbox().setFromLimits( limits )
+
+
     def line(self, start_pos, end_pos, **kwargs):
         return self.add( Line(start_pos, end_pos, **kwargs) )
 
@@ -99,6 +226,7 @@ class Group(Element):
 
 
     def pattern(self, pattern, **kwargs):
+        from .Pattern import Pattern
         return self.add( Pattern(pattern, **kwargs) )
 
 
@@ -108,10 +236,32 @@ class Group(Element):
         return self.add( g )
 
 
+    def _getTransformedElement(self, el):
+        # Returns el with the pending transformation of this group applied (lazily when possible)
+        if self._matrix is None:
+            return el
+        elif isinstance(el, Path) or isinstance(el, Group):
+            return el.getTransformed(self._matrix)
+        else:
+            return el.getPath().getTransformed(self._matrix)
+
+
     def getTransformed(self, func):
         new_group = Group(self.id, fill=self.fill, stroke_width=self.stroke_width, head_width=self.head_width, color=self.color)
 
+        if isinstance(func, Matrix):
+            # Lazy: share the elements and just record the transformation
+            new_group.elements = list(self.elements)
+            new_group.subgroups = dict(self.subgroups)
+            new_group._shared = True
+            if self._matrix is None:
+                new_group._matrix = func
+            else:
+                new_group._matrix = self._matrix.then(func)
+            return new_group
+
         for el in self.elements:
+            el = self._getTransformedElement(el)
             if isinstance(el, Path) or isinstance(el, Group):
                 new_el = el.getTransformed(func)
             else:
@@ -124,7 +274,7 @@ class Group(Element):
     def getPoints(self):
         points = []
         for el in self.elements:
-            points.extend( el.getPoints() )
+            points.extend( self._getTransformedElement(el).getPoints() )
         return points
 
 
@@ -139,15 +289,20 @@ class Group(Element):
                 if len(kwargs.items()) > 0:
                     tmp = copy.copy(el)
                     for key in kwargs:
-                        tmp.__dict__[key] = kwargs[key]
+                        setattr(tmp, key, kwargs[key])
                         print(key, tmp.__dict__[key])
                     path.add( tmp.getPath() )
                 else:
                     path.add( el.getPath() )
+
+        if self._matrix is not None:
+            path = path.getTransformed(self._matrix)
         return path
 
 
     def parseSVGNode(self, node):
+        # Fills the group from a xml.dom.minidom node. Surface.fromSVG() streams the file
+        # with ElementTree instead, this is kept for the code that parses its own DOM
         att = dom2dict(node)
             
         self.id = att.pop('id', self.id)
@@ -219,16 +374,21 @@ class Group(Element):
 
 
     def getSVGElementString(self):
+        file = io.StringIO()
+        self.writeSVGElement(file)
+        return file.getvalue()
+
+
+    def writeSVGElement(self, file):
         svg_str = '<g '
         if self.id != None:
             svg_str += f'id="{self.id}" '
         svg_str += f'fill="none" stroke="{self.color}" stroke-width="{self.head_width}">'
+        file.write(svg_str)
 
         for el in self.elements:
-            svg_str += el.getSVGElementString()
+            self._getTransformedElement(el).writeSVGElement(file)
 
-        svg_str += '</g>'
-        
-        return svg_str
+        file.write('</g>')
         
 
@@ -7,7 +7,6 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import numpy as np
-from PIL import Image as PILImage
 
 def normalise(im):
     """Normalize an image matrix from 0 - 255 to 0.0 - 1.0f range at 64bit  
@@ -41,6 +40,7 @@ def reshape(image):
 def load_image_rgb(filename):
     """Load a Image in a RGB 64bit floating point matrix
     """
+    from PIL import Image as PILImage
     img = PILImage.open( filename ).convert('RGB')
     array = np.array(img, np.uint8)
     array = extract_rgb(array)
@@ -51,6 +51,7 @@ def load_image_rgb(filename):
 def load_grayscale(filename):
     """Load a Image in a GRAYSCALE 64bit floating point matrix
     """
+    from PIL import Image as PILImage
     img = PILImage.open( filename ).convert('L')
     array = np.array(img, np.uint8)
     array = normalise(array)
@@ -61,6 +62,155 @@ def load_normalmap(filename):
     return load_image_rgb(filename) * 2.0 - 1.0
 
 
+# Dithering
+#
+# Error diffusion is sequential along a row, but everything a row spreads to the
+# rows below can be added at once once the row is done. The additions keep the
+# same order of the pixel by pixel loops (_ditherAtkinsonLoop, _ditherFloydSteinbergLoop),
+# so the results are identical. When numba is available those loops get compiled instead.
+
+def _ditherAtkinsonLoop(data, threshold):
+    H, W = data.shape
+    out = np.zeros((H, W))
+    derr = np.zeros((H, W))
+    div = 8
+    for y in range(H):
+        for x in range(W):
+            newval = derr[y,x] + data[y,x]
+            if newval >= threshold:
+                errval = newval - 1.0
+                out[y,x] = 1.
+            else:
+                errval = newval
+                out[y,x] = 0.
+            if x + 1 < W:
+                derr[y, x + 1] += errval / div
+                if x + 2 < W:
+                    derr[y, x + 2] += errval / div
+            if y + 1 < H:
+                # on x == 0 this wraps to the end of the row (as it always did)
+                derr[y + 1, x - 1] += errval / div
+                derr[y + 1, x] += errval / div
+                if y + 2 < H:
+                    derr[y + 2, x] += errval / div
+                if x + 1 < W:
+                    derr[y + 1, x + 1] += errval / div
+    return out
+
+
+def _ditherAtkinson(data, threshold):
+    H, W = data.shape
+    out = np.zeros((H, W))
+    derr = np.zeros((H, W))
+    div = 8
+    for y in range(H):
+        err = derr[y].tolist()
+        values = data[y].tolist()
+        spread = [0.0] * W
+        for x in range(W):
+            newval = err[x] + values[x]
+            if newval >= threshold:
+                errval = newval - 1.0
+                out[y, x] = 1.
+            else:
+                errval = newval
+            e = errval / div
+            if x + 1 < W:
+                err[x + 1] += e
+                if x + 2 < W:
+                    err[x + 2] += e
+            spread[x] = e
+
+        if y + 1 < H:
+            spread = np.array(spread)
+            below = derr[y + 1]
+            below[-1] += spread[0]
+            below[1:] += spread[:-1]
+            below += spread
+            below[:-1] += spread[1:]
+            if y + 2 < H:
+                derr[y + 2] += spread
+    return out
+
+
+def _ditherFloydSteinbergLoop(data, threshold):
+    H, W = data.shape
+    out = np.zeros((H, W))
+    derr = np.zeros((H, W))
+    for y in range(H):
+        for x in range(W):
+            newval = derr[y,x] + data[y,x]
+            if newval >= threshold:
+                errval = newval - 1.0
+                out[y,x] = 1.
+            else:
+                errval = newval
+                out[y,x] = 0.
+            if x + 1 < W:
+                derr[y, x + 1] += errval * 7 / 16
+            if y + 1 < H:
+                if x > 0:
+                    derr[y + 1, x - 1] += errval * 3 / 16
+                derr[y + 1, x] += errval * 5 / 16
+                if x + 1 < W:
+                    derr[y + 1, x + 1] += errval * 1 / 16
+    return out
+
+
+def _ditherFloydSteinberg(data, threshold):
+    H, W = data.shape
+    out = np.zeros((H, W))
+    derr = np.zeros((H, W))
+    for y in range(H):
+        err = derr[y].tolist()
+        values = data[y].tolist()
+        spread = [0.0] * W
+        for x in range(W):
+            newval = err[x] + values[x]
+            if newval >= threshold:
+                errval = newval - 1.0
+                out[y, x] = 1.
+            else:
+                errval = newval
+            if x + 1 < W:
+                err[x + 1] += errval * 7 / 16
+            spread[x] = errval
+
+        if y + 1 < H:
+            spread = np.array(spread)
+            below = derr[y + 1]
+            below[1:] += spread[:-1] * 1 / 16
+            below += spread * 5 / 16
+            below[:-1] += spread[1:] * 3 / 16
+    return out
+
+
+def _bayerMatrix(size):
+    m = np.zeros((1, 1))
+    while m.shape[0] < size:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return (m + 0.5) / m.size
+
+
+def _ditherBayer(data, threshold, size=4):
+    H, W = data.shape
+    m = _bayerMatrix(size)
+    m = np.tile(m, (H // m.shape[0] + 1, W // m.shape[1] + 1))[:H, :W]
+    return (data >= m + (threshold - 0.5)).astype(float)
+
+
+_compiled_loops = {}
+
+def _getCompiledLoop(loop):
+    if loop not in _compiled_loops:
+        try:
+            import numba
+            _compiled_loops[loop] = numba.njit(cache=True)(loop)
+        except ImportError:
+            _compiled_loops[loop] = None
+    return _compiled_loops[loop]
+
+
 class Image(object):
     def __init__( self, data, type='grayscale' ):
         self.filename = "nan"
@@ -139,31 +289,27 @@ class Image(object):
         return self
 
 
-    def dither(self, threshold=0.5, invert=False ):
-        derr = np.zeros(self.data.shape, dtype=float)
-
-        div = 8
-        for y in range(self.data.shape[0]):
-            for x in range(self.data.shape[1]):
-                newval = derr[y,x] + self.data[y,x]
-                if newval >= threshold:
-                    errval = newval - 1.0
-                    self.data[y,x] = 1.
-                else:
-                    errval = newval
-                    self.data[y,x] = 0.
-                if x + 1 < self.data.shape[1]:
-                    derr[y, x + 1] += errval / div
-                    if x + 2 < self.data.shape[1]:
-                        derr[y, x + 2] += errval / div
-                if y + 1 < self.data.shape[0]:
-                    derr[y + 1, x - 1] += errval / div
-                    derr[y + 1, x] += errval / div
-                    if y + 2 < self.data.shape[0]:
-                        derr[y + 2, x] += errval / div
-                    if x + 1 < self.data.shape[1]:
-                        derr[y + 1, x + 1] += errval / div
-        self.data = self.data[::1,:]
+    def dither(self, threshold=0.5, invert=False, kernel='atkinson', **kwargs):
+        """Dithers the grayscale image into a mask. Kernels: 'atkinson' (default),
+        'floyd-steinberg' or 'bayer' (ordered, takes a `size` power of two)"""
+        data = np.asarray(self.data, dtype=float)
+
+        if kernel == 'atkinson':
+            loop, rows = _ditherAtkinsonLoop, _ditherAtkinson
+        elif kernel == 'floyd-steinberg':
+            loop, rows = _ditherFloydSteinbergLoop, _ditherFloydSteinberg
+        elif kernel == 'bayer':
+            loop, rows = None, None
+        else:
+            raise Exception("Image: unknown dither kernel", kernel)
+
+        if rows is None:
+            self.data = _ditherBayer(data, threshold, kwargs.pop('size', 4))
+        elif _getCompiledLoop(loop) is not None:
+            self.data = _getCompiledLoop(loop)(data, float(threshold))
+        else:
+            self.data = rows(data, threshold)
+
         return self.threshold(0.5, not invert)
 
 
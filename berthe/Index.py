@@ -6,78 +6,267 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-# Mostly rom Axi by Michael Fogleman
+# Originally based on Axi by Michael Fogleman
 # https://github.com/fogleman/axi/blob/master/axi/spatial.py
 
-from math import hypot
-from collections import defaultdict
+import numpy as np
 
 from .Bbox import Bbox
 
+
+def _spread(v):
+    # Interleaves the bits of v (31 bits) with zeros
+    v = v & np.uint64(0x7FFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def nearest_neighbours(points, k=8, window=None):
+    """Returns a (N, k) array with the handles of the (approximated) k closest points
+    to each one of a (N, 2) array of points, sorted by distance and padded with -1.
+
+    The candidates are the `window` (k by default) points before and after each one
+    along two Z-order curves, the second one shifted a third of the way so their jumps
+    don't fall on the same places. Being orders, they adapt to any density of points."""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    N = points.shape[0]
+    result = np.full((N, k), -1, dtype=np.intp)
+    if N < 2 or k < 1:
+        return result
+
+    window = k if window is None else max(int(window), 1)
+    low = points.min(axis=0)
+    extent = max(float((points.max(axis=0) - low).max()), 1e-12)
+
+    # Position of every point along each curve, padded with -1 on both sides
+    curves = []
+    for shift in (0.0, extent / 3.0):
+        q = ((points - low + shift) * ((2**31 - 1) / (2.0 * extent))).astype(np.uint64)
+        sort = np.argsort(_spread(q[:, 0]) | (_spread(q[:, 1]) << np.uint64(1)), kind='stable')
+        at = np.empty(N, dtype=np.intp)
+        at[sort] = np.arange(N)
+        padded = np.concatenate([ np.full(window, -1, dtype=np.intp), sort, np.full(window, -1, dtype=np.intp) ])
+        curves.append( (padded, at + window) )
+
+    X = np.ascontiguousarray(points[:, 0])
+    Y = np.ascontiguousarray(points[:, 1])
+    steps = np.concatenate([ np.arange(-window, 0), np.arange(1, window + 1) ])
+    kk = min(k, 4 * window)
+    chunk = max(1, 2**20 // (4 * window))
+    for start in range(0, N, chunk):
+        h = np.arange(start, min(start + chunk, N))
+        candidates = np.hstack([ padded[ at[h][:, None] + steps ] for padded, at in curves ])
+
+        # Drop the points found on both curves
+        candidates.sort(axis=1)
+        candidates[:, 1:][ candidates[:, 1:] == candidates[:, :-1] ] = -1
+
+        # Squared distances (-1 takes the last point, but gets discarded)
+        dx = X.take(candidates) - X[h][:, None]
+        dy = Y.take(candidates) - Y[h][:, None]
+        dist = dx * dx + dy * dy
+        dist[ candidates < 0 ] = np.inf
+
+        closest = np.argpartition(dist, kk - 1, axis=1)[:, :kk]
+        closest = np.take_along_axis(closest, np.argsort(np.take_along_axis(dist, closest, axis=1), axis=1), axis=1)
+        found = np.take_along_axis(candidates, closest, axis=1)
+        found[ np.isinf(np.take_along_axis(dist, closest, axis=1)) ] = -1
+        result[h, :kk] = found
+
+    return result
+
+
 class Index(Bbox):
-    def __init__( self, chain, **kwargs):
-        Bbox.__init__(self, **kwargs);
-        self.n = kwargs.pop('n', 100)
-        self.min_x = min(p[0] for p in chain)
-        self.max_x = max(p[0] for p in chain)
-        self.min_y = min(p[1] for p in chain)
-        self.max_y = max(p[1] for p in chain)
-        self.bins = defaultdict(list)
-        self.size = 0
-        for point in chain:
-            self.insert(point)
-    
-
-    def normalize(self, x, y):
-        if self.width == 0.0:
-            px = 0.0
-        else:
-            px = (x - self.min_x) / self.width
-
-        if self.height == 0.0:
-            py = 0.0
-        else:
-            py = (y - self.min_y) / self.height
-            
-        i = int(px * self.n)
-        j = int(py * self.n)
-        return (i, j)
-
-
-    def insert(self, point):
-        x, y = point[:2]
-        i, j = self.normalize(x, y)
-        self.bins[(i, j)].append(point)
-        self.size += 1
-
-
-    def remove(self, point):
-        x, y = point[:2]
-        i, j = self.normalize(x, y)
-        self.bins[(i, j)].remove(point)
+    """Spatial index over a (N, 2) array of points to find the closest one to a position.
+
+    Points are referred by their handle (their position on the original array), so
+    removing one only takes updating the counts on its branch. It's a balanced kd-tree:
+    every node splits its points in halves by the median along the axis they spread
+    the most, so the cells adapt to the density of the points in 2D (clusters,
+    diagonals or curves). The tree gets rebuilt as points are removed so the search
+    never walks through large empty areas.
+    """
+    def __init__( self, points, **kwargs):
+        Bbox.__init__(self)
+        self.leaf_size = max(int(kwargs.pop('leaf_size', 8)), 1)
+
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.alive = np.ones(self.points.shape[0], dtype=bool)
+        self.size = self.points.shape[0]
+
+        self._build()
+
+
+    def _build(self):
+        handles = np.flatnonzero(self.alive)
+        m = handles.shape[0]
+        self._built_size = m
+
+        if m > 0:
+            self.min_x, self.min_y = self.points[handles].min(axis=0)
+            self.max_x, self.max_y = self.points[handles].max(axis=0)
+
+        depth = 0
+        while m > self.leaf_size << depth:
+            depth += 1
+
+        # Nodes are numbered level by level (the children of node i are 2i + 1 and 2i + 2).
+        # The points of node k of a level are on positions [k * m // count, (k + 1) * m // count)
+        # of both orders, sorted by x on the first and by y on the second
+        points = self.points[handles]
+        orders = [ np.argsort(points[:, 0], kind='stable'), np.argsort(points[:, 1], kind='stable') ]
+        positions = np.arange(m)
+        axis = []
+        split = []
+        for level in range(depth):
+            count = 1 << level
+            starts = np.arange(count) * m // count
+            mids = (2 * np.arange(count) + 1) * m // (2 * count)
+            ends = np.append(starts[1:], m)
+            node = np.repeat(np.arange(count), ends - starts)
+
+            # Split every node by the median along the axis where its points spread the most
+            spread = [ points[o[ends - 1], i] - points[o[starts], i] for i, o in enumerate(orders) ]
+            node_axis = (spread[1] > spread[0]).astype(np.intp)
+            by_axis = np.where(node_axis[node] == 1, orders[1], orders[0])
+            right = np.empty(m, dtype=bool)
+            right[by_axis] = positions >= mids[node]
+
+            # Points on the left child are <= the split and the ones on the right >= it
+            axis.extend( node_axis.tolist() )
+            split.extend( points[by_axis[mids], node_axis].tolist() )
+
+            # Move the points of every node to their child, keeping them sorted
+            for i, o in enumerate(orders):
+                r = right[o]
+                before_right = np.cumsum(r) - r
+                # Left: start of the node + lefts before it on the node, right: its mid + rights before
+                shift_right = (mids - before_right[starts])[node]
+                shift_left = (before_right[starts])[node]
+                position = np.where(r, before_right + shift_right, positions - before_right + shift_left)
+                orders[i] = np.empty(m, dtype=np.intp)
+                orders[i][position] = o
+
+        handles = handles[orders[0]]
+
+        leaves = 1 << depth
+        starts = np.arange(leaves + 1) * m // leaves
+        counts = np.diff(starts)
+        levels = [ counts ]
+        while levels[-1].shape[0] > 1:
+            levels.append( levels[-1][0::2] + levels[-1][1::2] )
+
+        self._depth = depth
+        self._first_leaf = leaves - 1
+        self._axis = axis
+        self._split = split
+        self._count = np.concatenate(levels[::-1]).tolist()
+        self._starts = starts.tolist()
+
+        # Per position on the tree
+        self._handles = handles.tolist()
+        self._x = self.points[handles, 0].tolist()
+        self._y = self.points[handles, 1].tolist()
+        self._live = [ True ] * m
+
+        self._position = np.full(self.points.shape[0], -1, dtype=np.intp)
+        self._position[handles] = np.arange(m)
+        self._leaf_of = np.repeat(np.arange(leaves) + leaves - 1, counts)
+
+
+    def remove(self, handle):
+        if not self.alive[handle]:
+            return
+        self.alive[handle] = False
         self.size -= 1
 
+        position = self._position[handle]
+        self._live[position] = False
+        node = int(self._leaf_of[position])
+        count = self._count
+        count[node] -= 1
+        while node > 0:
+            node = (node - 1) >> 1
+            count[node] -= 1
+
+        # Keep the tree tight when most of the points are gone
+        if self.size > 0 and self.size * 4 < self._built_size:
+            self._build()
+
 
     def nearest(self, point):
-        x, y = point[:2]
-        i, j = self.normalize(x, y)
-        points = []
-        r = 0
-        while not points:
-            points.extend(self.ring(i, j, r))
-            r += 1
-        points.extend(self.ring(i, j, r))
-        return min(points, key=lambda p: (hypot(x - p[0], y - p[1]), p[1], p[0]))
-
-
-    def ring(self, i, j, r):
-        if r == 0:
-            return self.bins[(i, j)]
-        result = []
-        for p in range(i - r, i + r + 1):
-            result.extend(self.bins[(p, j - r)])
-            result.extend(self.bins[(p, j + r)])
-        for q in range(j - r + 1, j + r):
-            result.extend(self.bins[(i - r, q)])
-            result.extend(self.bins[(i + r, q)])
-        return result
\ No newline at end of file
+        """Returns the handle of the closest point still on the index (or None)"""
+        if self.size == 0:
+            return None
+
+        x = float(point[0])
+        y = float(point[1])
+        axis, split, count = self._axis, self._split, self._count
+        starts, live, X, Y = self._starts, self._live, self._x, self._y
+        first_leaf = self._first_leaf
+
+        # Down to the leaf of the point first, keeping the other side of every split
+        # to look at later (deepest first) if it can still be closer than the best so
+        # far. Squared distances, ties broken by y and then x
+        stack = []
+        node = 0
+        while node < first_leaf:
+            diff = (y if axis[node] else x) - split[node]
+            left = 2 * node + 1
+            if diff < 0:
+                stack.append( (left + 1, diff * diff) )
+                node = left
+            else:
+                stack.append( (left, diff * diff) )
+                node = left + 1
+        stack.append( (node, 0.0) )
+
+        best = float('inf')
+        best_x = best_y = best
+        found = -1
+        while stack:
+            node, bound = stack.pop()
+            if bound > best or count[node] == 0:
+                continue
+
+            if node >= first_leaf:
+                leaf = node - first_leaf
+                for p in range(starts[leaf], starts[leaf + 1]):
+                    if live[p]:
+                        dx = X[p] - x
+                        dy = Y[p] - y
+                        d = dx * dx + dy * dy
+                        if d < best or (d == best and (Y[p], X[p]) < (best_y, best_x)):
+                            best = d
+                            best_x = X[p]
+                            best_y = Y[p]
+                            found = p
+                continue
+
+            diff = (y if axis[node] else x) - split[node]
+            far = diff * diff
+            if far < bound:
+                far = bound
+            left = 2 * node + 1
+            if diff < 0:
+                stack.append( (left + 1, far) )
+                stack.append( (left, bound) )
+            else:
+                stack.append( (left, far) )
+                stack.append( (left + 1, bound) )
+
+        return self._handles[found]
+
+
+    def neighbours(self, k=8, window=None):
+        """Returns a (N, k) array with the handles of the (approximated) k closest points
+        still on the index to each one of them, padded with -1 (see nearest_neighbours)"""
+        result = np.full((self.points.shape[0], k), -1, dtype=np.intp)
+        handles = np.flatnonzero(self.alive)
+        found = nearest_neighbours(self.points[handles], k, window)
+        result[handles] = np.where(found >= 0, handles[found], -1)
+        return result
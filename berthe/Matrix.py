@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import numpy as np
+
+class Matrix(object):
+    """3x3 affine matrix. Chained operations (translate, scale, rotate) compose
+    into a single matrix so they can be applied to a whole (N, 2) vertex array
+    in one NumPy call.
+
+    It follows the same conventions of tools.transform():
+        Matrix(translate=t, rotate=r, scale=s, anchor=a).apply(points)
+    returns the same as calling transform(p, rotate=r, scale=s, translate=t, anchor=a) on every point.
+    """
+    def __init__( self, matrix=None, **kwargs ):
+        if matrix is None:
+            self.data = np.identity(3)
+        elif isinstance(matrix, Matrix):
+            self.data = matrix.data.copy()
+        else:
+            self.data = np.array(matrix, dtype=float).reshape(3, 3)
+
+        translate = kwargs.pop('translate', None)
+        rotate = kwargs.pop('rotate', 0.0)
+        scale = kwargs.pop('scale', 1.0)
+        anchor = kwargs.pop('anchor', None)
+
+        if anchor is not None and (anchor[0] != 0.0 or anchor[1] != 0.0):
+            self.data = self.translate(-anchor[0], -anchor[1]).data
+
+        if rotate != 0.0:
+            self.data = self.rotate(rotate).data
+
+        if isinstance(scale, tuple) or isinstance(scale, list) or isinstance(scale, np.ndarray):
+            self.data = self.scale(scale[0], scale[1]).data
+        elif scale != 1.0:
+            self.data = self.scale(scale).data
+
+        if anchor is not None and (anchor[0] != 0.0 or anchor[1] != 0.0):
+            self.data = self.translate(anchor[0], anchor[1]).data
+
+        if translate is not None:
+            self.data = self.translate(translate[0], translate[1]).data
+
+
+    def __repr__(self):
+        return "Matrix({}, {}, {}, {}, {}, {})".format(
+            self.data[0, 0], self.data[0, 1], self.data[0, 2],
+            self.data[1, 0], self.data[1, 1], self.data[1, 2])
+
+
+    def __mul__(self, other):
+        # A * B applies B first and then A
+        return Matrix( self.data.dot(other.data) )
+
+
+    def __matmul__(self, other):
+        return self.__mul__(other)
+
+
+    def __call__(self, x, y):
+        # So a matrix can be used where a func(x, y) is expected
+        a, b, c = self.data[0]
+        d, e, f = self.data[1]
+        return (a * x + b * y + c, d * x + e * y + f)
+
+
+    @property
+    def isIdentity(self):
+        return np.array_equal(self.data, np.identity(3))
+
+
+    @property
+    def isAxisAligned(self):
+        """True when it only translates and scales (so boxes stay boxes)"""
+        return self.data[0, 1] == 0.0 and self.data[1, 0] == 0.0
+
+
+    def applyToLimits(self, limits):
+        """Bounding box (min_x, min_y, max_x, max_y) of the corners of a transformed box.
+        It's the exact bounds of what's inside only when the matrix isAxisAligned"""
+        min_x, min_y, max_x, max_y = limits
+        if min_x > max_x or min_y > max_y:
+            return limits
+        corners = self.apply([ [min_x, min_y], [max_x, min_y], [max_x, max_y], [min_x, max_y] ])
+        return tuple(corners.min(axis=0).tolist() + corners.max(axis=0).tolist())
+
+
+    def inverse(self):
+        return Matrix( np.linalg.inv(self.data) )
+
+
+    def then(self, other):
+        """Returns a new matrix that applies this one and then other"""
+        return Matrix( other.data.dot(self.data) )
+
+
+    def translate(self, dx, dy):
+        m = np.identity(3)
+        m[0, 2] = dx
+        m[1, 2] = dy
+        return Matrix( m.dot(self.data) )
+
+
+    def scale(self, sx, sy=None):
+        if sy is None:
+            sy = sx
+        m = np.identity(3)
+        m[0, 0] = sx
+        m[1, 1] = sy
+        return Matrix( m.dot(self.data) )
+
+
+    def rotate(self, angle, anchor=None):
+        c = math.cos(math.radians(angle))
+        s = math.sin(math.radians(angle))
+        m = np.identity(3)
+        m[0, 0] = c
+        m[0, 1] = -s
+        m[1, 0] = s
+        m[1, 1] = c
+
+        if anchor is None:
+            return Matrix( m.dot(self.data) )
+
+        return self.translate(-anchor[0], -anchor[1]).then( Matrix(m) ).translate(anchor[0], anchor[1])
+
+
+    def apply(self, points):
+        """Transforms a (N, 2) array of points, returning a new (N, 2) float64 array"""
+        points = np.asarray(points, dtype=float)
+        if points.size == 0:
+            return np.zeros((0, 2))
+        points = points.reshape(points.shape[0], -1)[:, :2]
+        return points.dot(self.data[:2, :2].T) + self.data[:2, 2]
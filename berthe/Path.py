@@ -6,43 +6,75 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import io
 import math
 import numpy as np
 
+from .Bbox import Bbox
 from .Element import Element
 from .Index import Index
-from .tools import path_length, transform
+from .Matrix import Matrix
+from .optimize import optimize_travel
+from .tools import pack_path, unpack_path, packed_lengths, resample_path, parse_svg_path
 
 # Mostly rom Axi by Michael Fogleman
 # https://github.com/fogleman/axi/blob/master/axi/spatial.py
 
 class Path(Element):
+    # A Path already is geometry (getPath() returns itself) so there is nothing to invalidate
+    __setattr__ = object.__setattr__
+
     def __init__(self, path=None, **kwargs):
+        vertices = kwargs.pop('vertices', None)
+        offsets = kwargs.pop('offsets', None)
         Element.__init__(self, **kwargs);
         # self.head_width = kwargs.pop('head_width', 0.2)
         # self.id = kwargs.pop('id', None)
 
-        if path is None:
-            self.path = []
+        # Geometry is stored packed: one contiguous (N, 2) float64 vertex buffer
+        # plus N+1 offsets marking where each polyline starts. The list of lists 
+        # view (self.path) is derived lazily only when someone asks for it.
+        self._vertices = np.zeros((0, 2))
+        self._offsets = np.zeros(1, dtype=np.intp)
+        self._pending = []
+        self._path = None
+
+        # Affine transformations (Matrix) waiting to be applied to _vertices. 
+        # They are only baked in once someone consumes the vertices.
+        self._matrix = None
+
+        self._length = None
+        self._down_length = None
+        self._bounds = None
+
+        if vertices is not None:
+            self._vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+            if offsets is None:
+                offsets = [0, self._vertices.shape[0]]
+            self._offsets = np.asarray(offsets, dtype=np.intp)
+
+        elif path is None:
+            pass
+
         elif isinstance(path, Path):
-            self.path = path.path
+            self._vertices, self._offsets = path._pack(bake=False)
+            self._matrix = path._matrix
+            self._bounds = path._bounds
 
         elif isinstance(path, Element):
-            self.path = path.getPath()
+            self._vertices, self._offsets = path.getPath()._pack()
 
         elif isinstance(path, str):
-            self.path = []
             self.setFromString(path)
 
         else:
-            self.path = path
-
-        self._length = None
-        self._down_length = None
+            self._vertices, self._offsets = pack_path(path)
 
 
     def __len__(self):
-        return len(self.path)
+        if self._path is not None:
+            return len(self._path)
+        return self._pack(bake=False)[1].shape[0] - 1
 
 
     def __iter__(self):
@@ -51,7 +83,7 @@ class Path(Element):
 
 
     def __next__(self):
-        if self._index < len(self.path):
+        if self._index < len(self):
             result = self[ self._index ]
             self._index += 1
             return result
@@ -66,20 +98,100 @@ class Path(Element):
     def __getitem__(self, index):
         from .Polyline import Polyline
         if type(index) is int:
-            return Polyline( self.path[index], translate=self.translate, scale=self.scale, rotate=self.rotate, head_width=self.head_width, color=self.color )
+            return Polyline( self.getPolylinePoints(index).tolist(), translate=self.translate, scale=self.scale, rotate=self.rotate, head_width=self.head_width, color=self.color )
         else:
             return None
 
 
+    def _pack(self, bake=True):
+        """Consolidates the storage into the packed buffers and returns (vertices, offsets).
+        With bake=False pending transformations are left in self._matrix"""
+        if self._path is not None:
+            # The list view was handed out and may have been edited, so it wins
+            self._vertices, self._offsets = pack_path(self._path)
+            self._path = None
+
+        if self._matrix is not None and (bake or len(self._pending) > 0):
+            self._vertices = self._matrix.apply(self._vertices)
+            self._matrix = None
+
+        if len(self._pending) > 0:
+            vertices = [self._vertices] + [v for v, o in self._pending]
+            offsets = [self._offsets]
+            start = self._offsets[-1]
+            for v, o in self._pending:
+                offsets.append(o[1:] + start)
+                start += o[-1]
+            self._vertices = np.concatenate(vertices)
+            self._offsets = np.concatenate(offsets)
+            self._pending = []
+
+        return self._vertices, self._offsets
+
+
+    def _touch(self):
+        self._length = None
+        self._down_length = None
+        self._bounds = None
+        if self.parent is not None:
+            self.parent._dropBounds(self)
+
+
+    @property
+    def vertices(self):
+        """Contiguous (N, 2) float64 buffer with the vertices of all polylines"""
+        return self._pack()[0]
+
+
+    @property
+    def offsets(self):
+        """Index on vertices where each polyline starts (plus a last one for the end)"""
+        return self._pack(bake=False)[1]
+
+
+    @property
+    def path(self):
+        # List of lists view of the packed storage. Once handed out it becomes the
+        # source of truth (so it can be edited in place) until the packed buffers
+        # are needed again.
+        if self._path is None:
+            vertices, offsets = self._pack()
+            self._path = unpack_path(vertices, offsets)
+        self._touch()
+        return self._path
+
+
+    @path.setter
+    def path(self, path):
+        self._pending = []
+        self._path = None
+        self._matrix = None
+        self._vertices, self._offsets = pack_path(path)
+        self._touch()
+
+
+    def getPolylinePoints(self, index):
+        """Returns a (M, 2) view of the vertices of the polyline at index"""
+        vertices, offsets = self._pack()
+        return vertices[offsets[index]:offsets[index + 1]]
+
+
+    def _iterPolylines(self):
+        vertices, offsets = self._pack()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield vertices[start:end]
+
+
     @property
     def length(self):
         if self._length is None:
-            length = self.down_length
-            for p0, p1 in zip(self.path, self.path[1:]):
-                x0, y0 = p0[-1]
-                x1, y1 = p1[0]
-                length += math.hypot(x1 - x0, y1 - y0)
-            self._length = length
+            vertices, offsets = self._pack()
+            if vertices.shape[0] < 2:
+                self._length = 0.0
+            else:
+                # the pen goes through every vertex in order, so the total length
+                # is just the sum of all segments (pen-up jumps included)
+                self._length = float(np.hypot(*np.diff(vertices, axis=0).T).sum())
         return self._length
 
 
@@ -91,10 +203,22 @@ class Path(Element):
     @property
     def down_length(self):
         if self._down_length is None:
-            self._down_length = path_length(self.path)
+            vertices, offsets = self._pack()
+            if vertices.shape[0] < 2:
+                self._down_length = 0.0
+            else:
+                self._down_length = float(packed_lengths(vertices, offsets)[-1])
         return self._down_length
 
 
+    @property
+    def bounds(self):
+        # (min_x, min_y, max_x, max_y) is kept until the geometry changes
+        if self._bounds is None:
+            self._bounds = Bbox( points=self._pack()[0] ).limits
+        return Bbox().setFromLimits( self._bounds )
+
+
     @property
     def width(self):
         return self.bounds.width
@@ -109,225 +233,49 @@ class Path(Element):
         from .Polyline import Polyline
 
         if isinstance(other, Path):
-            self.path.extend( other.path )
+            chunk = other._pack()
         elif isinstance(other, Polyline):
             points  = other.getPoints() 
-            if len(points) > 1: 
-                self.path.append( points )
+            if len(points) < 2: 
+                return
+            chunk = pack_path([points])
         elif isinstance(other, Element):
-            self.path.extend( other.getPath() )
-        elif isinstance(other, list):
-            self.path.append( other )
+            chunk = other.getPath()._pack()
+        elif isinstance(other, (list, tuple, np.ndarray)):
+            chunk = pack_path([other])
         else:
             raise Exception("Error, don't know what to do with: ", other)
 
+        bounds = self._bounds
+        if self._path is not None:
+            self._path.extend( unpack_path(*chunk) )
+        else:
+            self._pending.append( chunk )
+        self._touch()
 
-    def setFromString(self, path_string, **kwargs):
-
-        # From Andy Port 
-        # https://github.com/mathandy/svgpathtools/blob/master/svgpathtools/parser.py#L35
-
-        import re
-        COMMANDS = set('MmZzLlHhVvCcSsQqTtAa')
-        UPPERCASE = set('MZLHVCSQTA')
-
-        COMMAND_RE = re.compile("([MmZzLlHhVvCcSsQqTtAa])")
-        FLOAT_RE = re.compile("[-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?")
-
-        def tokenize_path(pathdef):
-            for x in COMMAND_RE.split(pathdef):
-                if x in COMMANDS:
-                    yield x
-                for token in FLOAT_RE.findall(x):
-                    yield token
-
-        # In the SVG specs, initial movetos are absolute, even if
-        # specified as 'm'. This is the default behavior here as well.
-        # But if you pass in a current_pos variable, the initial moveto
-        # will be relative to that current_pos. This is useful.
-
-        elements = list(tokenize_path(path_string))
+        # Growing the bounds only needs a look at the new vertices
+        if bounds is not None:
+            bbox = Bbox().setFromLimits( bounds )
+            bbox.join( Bbox( points=chunk[0] ) )
+            self._bounds = bbox.limits
 
-        # Reverse for easy use of .pop()
-        elements.reverse()
 
-        current_pos = np.array([0.0, 0.0])
-        start_pos = np.array([0.0, 0.0])
-        command = None
-        last_control = []
+    def setFromString(self, path_string, **kwargs):
+        """Adds the polylines of SVG path data (the `d` attribute of a <path>), with 
+        curves flattened to `resolution` points"""
+        resolution = kwargs.pop('resolution', 100)
+        vertices, offsets = parse_svg_path(path_string, resolution)
+        self.add( Path(vertices=vertices, offsets=offsets, head_width=self.head_width).getSimplify() )
 
-        from .Polyline import Polyline
-        poly = Polyline(fill=self.fill, stroke_width=self.stroke_width)
-
-        while elements:
-            if elements[-1] in COMMANDS:
-                # New command.
-                last_command = command  # Used by S and T
-                command = elements.pop()
-                absolute = command in UPPERCASE
-                command = command.upper()
-            else:
-                # If this element starts with numbers, it is an implicit command
-                # and we don't change the command. Check that it's allowed:
-                if command is None:
-                    raise ValueError("Unallowed implicit command in %s, position %s" % (
-                        path_string, len(path_string.split()) - len(elements)))
-
-            if command == 'M':
-                # Moveto command.
-                pos = np.array([float(elements.pop()), float(elements.pop())])
-                if absolute:
-                    current_pos = pos
-                else:
-                    current_pos += pos
-
-                # when M is called, reset start_pos
-
-                if poly.size() > 0:
-                    self.add( poly.getPath() )
-                    poly = Polyline(fill=self.fill, stroke_width=self.stroke_width)
-
-                # This behavior of Z is defined in svg spec:
-                # http://www.w3.org/TR/SVG/paths.html#PathDataClosePathCommand
-                start_pos = current_pos
-
-                # Implicit moveto commands are treated as lineto commands.
-                # So we set command to lineto here, in case there are
-                # further implicit commands after this moveto.
-                command = 'L'
-                poly.lineTo( current_pos )
-
-            elif command == 'Z':
-                # Close path
-                # if not (current_pos.all() == start_pos.all()):
-                #     poly.lineTo( start_pos )
-
-                poly.setClosed( True )
-                poly = poly.getSimplify()
-                self.add( poly.getPath() )
-                poly = Polyline(fill=self.fill, stroke_width=self.stroke_width)
-
-                current_pos = start_pos
-                command = None
-
-            elif command == 'L':
-                pos = np.array([float(elements.pop()), float(elements.pop())])
-                if not absolute:
-                    pos += current_pos
-
-                poly.lineTo( pos )
-                current_pos = pos
-
-            elif command == 'H':
-                pos = np.array([float(elements.pop()), current_pos[1]])
-                if not absolute:
-                    pos += np.array([ current_pos[0], 0 ])
-                poly.lineTo( pos )
-                current_pos = pos
-
-            elif command == 'V':
-                pos = np.array([current_pos[0], float(elements.pop())])
-                if not absolute:
-                    pos += np.array([ 0, current_pos[1] ])
-                poly.lineTo( pos )
-                current_pos = pos
-
-            elif command == 'C':
-                control1 = np.array([float(elements.pop()), float(elements.pop())])
-                control2 = np.array([float(elements.pop()), float(elements.pop())])
-                end = np.array([float(elements.pop()), float(elements.pop())])
-
-                if not absolute:
-                    control1 += current_pos
-                    control2 += current_pos
-                    end += current_pos
-
-                poly.cubicBezierTo( control1, control2, end )
-                current_pos = end
-                last_control = control2[:]
-
-            elif command == 'S':
-                # Smooth curve. First control point is the "reflection" of
-                # the second control point in the previous path.
-
-                if last_command not in 'CS':
-                    # If there is no previous command or if the previous command
-                    # was not an C, c, S or s, assume the first control point is
-                    # coincident with the current point.
-                    control1 = current_pos
-                else:
-                    # The first control point is assumed to be the reflection of
-                    # the second control point on the previous command relative
-                    # to the current point.
-                    control1 = current_pos + current_pos - last_control
-
-                control2 = np.array([float(elements.pop()), float(elements.pop())])
-                end = np.array([float(elements.pop()), float(elements.pop())])
-
-                if not absolute:
-                    control2 += current_pos
-                    end += current_pos
-
-                poly.cubicBezierTo( control1, control2, end )
-                current_pos = end
-                last_control = control2
-
-            # elif command == 'Q':
-            #     control = float(elements.pop()) + float(elements.pop()) * 1j
-            #     end = float(elements.pop()) + float(elements.pop()) * 1j
-
-            #     if not absolute:
-            #         control += current_pos
-            #         end += current_pos
-
-            #     segments.append(QuadraticBezier(current_pos, control, end))
-            #     current_pos = end
-
-            # elif command == 'T':
-            #     # Smooth curve. Control point is the "reflection" of
-            #     # the second control point in the previous path.
-
-            #     if last_command not in 'QT':
-            #         # If there is no previous command or if the previous command
-            #         # was not an Q, q, T or t, assume the first control point is
-            #         # coincident with the current point.
-            #         control = current_pos
-            #     else:
-            #         # The control point is assumed to be the reflection of
-            #         # the control point on the previous command relative
-            #         # to the current point.
-            #         control = current_pos + current_pos - segments[-1].control
-
-            #     end = float(elements.pop()) + float(elements.pop()) * 1j
-
-            #     if not absolute:
-            #         end += current_pos
-
-            #     segments.append(QuadraticBezier(current_pos, control, end))
-            #     current_pos = end
-
-            elif command == 'A':
-                radius = np.array([float(elements.pop()), float(elements.pop())])
-                rotation = float(elements.pop())
-                arc = float(elements.pop())
-                sweep = float(elements.pop())
-                end = np.array([float(elements.pop()), float(elements.pop())])
-
-                if not absolute:
-                    end += current_pos
-
-                poly.arcTo( end, radius, large_arc=arc, sweep=sweep, rotate=rotation )
-                current_pos = end
-            else:
-                print('Command', command, 'in not implemented' )
 
-        if poly.size() > 0:
-            poly = poly.getSimplify()
-            self.add( poly.getPath() )
+    def getPoints(self):
+        return self.vertices.tolist()
 
 
-    def getPoints(self):
-        return [(x, y) for points in self.path for x, y in points]
+    def getPath(self, **kwargs):
+        # A Path already is geometry, going through getPoints() would join
+        # all its polylines into a single one (drawing the pen-up moves)
+        return self
 
 
     def getConvexHull(self):
@@ -340,82 +288,127 @@ class Path(Element):
         if geometry is None:
             raise Exception('Polyline.getConvexHull() requires Shapely')
 
-        polygon = geometry.Polygon( self.getPoints() )
-        return Polyline( polygon.convex_hull.exterior.coords, head_width=self.head_width, color=self.color )
+        polygon = geometry.MultiPoint( self.vertices )
+        return Polyline( list(polygon.convex_hull.exterior.coords), head_width=self.head_width, color=self.color )
 
 
     def getPattern(self, width, height, **kwargs):
         resolution = kwargs.pop('resolution', None)
 
         from .Pattern import Pattern
-        from .Polyline import Polyline
         pattern = Pattern(width=width, height=height, **kwargs, color=self.color)
 
-        for points in self.path:
-        
-            if resolution:
-                poly = Polyline(points)
-                poly = poly.getResampledBySpacing(resolution)
-                points = poly.getPoints()
+        path = self
+        if resolution:
+            path = self.getResampledBySpacing(resolution)
 
-            N = len(points)
-            x = np.zeros(int(N)+1)
-            y = np.zeros(int(N)+1)
-            x.fill(np.nan)
-            y.fill(np.nan)
+        vertices, offsets = path._pack()
 
-            for i in range(N):
-                X, Y = points[i]
-                x[i] = X / float(pattern.width)
-                y[i] = Y / float(pattern.height)
+        # Each polyline is followed by a nan separator
+        x = np.insert(vertices[:, 0] / float(pattern.width), offsets[1:], np.nan)
+        y = np.insert(vertices[:, 1] / float(pattern.height), offsets[1:], np.nan)
+        pattern.add( (x, y) )
 
-            x[N] = np.nan
-            y[N] = np.nan
+        return pattern
 
-            pattern.add( (x.flatten('F'), y.flatten('F')) )
 
-        return pattern
+    def _gather(self, order, reverse=None, **kwargs):
+        """Returns a new Path with the polylines in the given order, optionally reversed"""
+        vertices, offsets = self._pack()
+        order = np.asarray(order, dtype=np.intp)
+
+        starts = offsets[:-1][order]
+        ends = offsets[1:][order]
+        counts = ends - starts
+
+        new_offsets = np.zeros(order.shape[0] + 1, dtype=np.intp)
+        np.cumsum(counts, out=new_offsets[1:])
+
+        local = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1], counts)
+        index = np.repeat(starts, counts) + local
+        if reverse is not None:
+            reverse = np.repeat(np.asarray(reverse, dtype=bool), counts)
+            index = np.where(reverse, np.repeat(ends - 1, counts) - local, index)
+
+        return Path( vertices=vertices[index], offsets=new_offsets, **kwargs )
 
 
     def getSorted(self, reversable=True):
-        if len(self.path) < 2:
+        if len(self) < 2:
             return self
 
-        path = self.path[:]
-
-        first = path[0]
-        path.remove(first)
-        result = [first]
-        points = []
+        vertices, offsets = self._pack()
+        # skip empty polylines
+        valid = np.flatnonzero(offsets[1:] > offsets[:-1])
+        if valid.shape[0] < 2:
+            return self
 
-        for path in path:
-            x1, y1 = path[0]
-            x2, y2 = path[-1]
-            points.append((x1, y1, path, False))
+        starts = vertices[offsets[valid]]
+        ends = vertices[offsets[valid + 1] - 1]
 
-            if reversable:
-                points.append((x2, y2, path, True))
+        # Handles [0, m) are the start of the polylines (after the first one) 
+        # and [m, 2m) their ends, which means going through them in reverse
+        m = valid.shape[0] - 1
+        if reversable:
+            points = np.concatenate([starts[1:], ends[1:]])
+        else:
+            points = starts[1:]
 
-        if len(points) <= 2:
+        if points.shape[0] <= 2:
             return self
 
-        index = Index( chain=points )
+        index = Index( points )
 
+        order = [valid[0]]
+        reverse = [False]
+        last = ends[0]
         while index.size > 0:
-            x, y, path, reverse = index.nearest(result[-1][-1])
-            x1, y1 = path[0]
-            x2, y2 = path[-1]
-            index.remove((x1, y1, path, False))
+            handle = index.nearest(last)
+            i = handle % m
+            index.remove(i)
 
             if reversable:
-                index.remove((x2, y2, path, True))
+                index.remove(i + m)
 
-            if reverse:
-                result.append(list(reversed(path)))
+            order.append(valid[i + 1])
+            reverse.append(handle >= m)
+            if handle >= m:
+                last = starts[i + 1]
             else:
-                result.append(path)
+                last = ends[i + 1]
+
+        return self._gather( order, reverse, head_width=self.head_width, color=self.color )
+
+
+    def getOptimized(self, **kwargs):
+        """Sorts the polylines (see getSorted) and then keeps improving the pen-up travel
+        with 2-opt and Or-opt moves for up to `time_budget` seconds. With `return_lengths`
+        returns it together with the pen-up travel (original, sorted, optimized)."""
+        time_budget = kwargs.pop('time_budget', 5.0)
+        reversable = kwargs.pop('reversable', True)
+        neighbours = kwargs.pop('neighbours', 8)
+        verbose = kwargs.pop('verbose', False)
+        return_lengths = kwargs.pop('return_lengths', False)
+
+        sorted_path = self.getSorted(reversable)
+        vertices, offsets = sorted_path._pack()
+        valid = np.flatnonzero(offsets[1:] > offsets[:-1])
+        if valid.shape[0] < 3:
+            path = sorted_path
+            sorted_length = optimized_length = sorted_path.up_length
+        else:
+            starts = vertices[offsets[valid]]
+            ends = vertices[offsets[valid + 1] - 1]
+            order, reverse, sorted_length, optimized_length = optimize_travel(starts, ends, time_budget=time_budget, reversable=reversable, neighbours=neighbours)
+            path = sorted_path._gather( valid[order], reverse, head_width=self.head_width, color=self.color )
 
-        return Path( result, head_width=self.head_width, color=self.color )
+        lengths = (self.up_length, sorted_length, optimized_length)
+        if verbose:
+            print('Path.getOptimized(): pen-up travel {:.2f} -> {:.2f} (sorted) -> {:.2f} (optimized)'.format(*lengths))
+
+        if return_lengths:
+            return path, lengths
+        return path
 
 
     def getJoined(self, tolerance = None, boundary = None):
@@ -428,152 +421,195 @@ class Path(Element):
             print('Path.joined() will not work with boundary bacause needs Shapely')
             boundary = None
 
-        if len(self.path) < 2:
+        if len(self) < 2:
             return self
 
         if tolerance is None:
             tolerance = self.head_width
 
-        result = [list(self.path[0])]
-        for path in self.path[1:]:
-            x1, y1 = result[-1][-1]
-            x2, y2 = path[0]
+        vertices, offsets = self._pack()
+        # drop empty polylines
+        offsets = np.unique(offsets)
+        
+        # Joining two consecutive polylines is just dropping the offset between them
+        cuts = offsets[1:-1]
+        ends = vertices[cuts - 1]
+        starts = vertices[cuts]
+
+        if boundary != None:
+            join = np.zeros(cuts.shape[0], dtype=bool)
+            for i, (end, start) in enumerate(zip(ends.tolist(), starts.tolist())):
+                walk_path = geometry.LineString( [end, start] )
+                walk_cut = walk_path.buffer( self.head_width * 0.5 )
+                join[i] = walk_cut.within(boundary) # and walk_path.length < max_walk
+        else:
+            join = np.hypot(*(starts - ends).T) <= tolerance
 
-            join = False
+        offsets = np.concatenate([offsets[:1], cuts[~join], offsets[-1:]])
+        return Path(vertices=vertices, offsets=offsets, color=self.color)
 
-            if boundary != None:
-                walk_path = geometry.LineString( [result[-1][-1], path[0]] )
-                walk_cut = walk_path.buffer( self.head_width * 0.5 )
-                join = walk_cut.within(boundary) # and walk_path.length < max_walk
-            else:
-                join = math.hypot(x2 - x1, y2 - y1) <= tolerance
 
-            if join:
-                result[-1].extend(path)
-            else:
-                result.append(list(path))
+    def _getLineStrings(self, min_points=2):
+        """Returns the polylines with at least min_points as an array of shapely LineStrings (built in bulk on shapely 2)"""
+        import shapely
+        vertices, offsets = self._pack()
+        counts = np.diff(offsets)
+        valid = np.flatnonzero(counts >= min_points)
+
+        if hasattr(shapely, 'linestrings'):
+            keep = np.repeat(counts >= min_points, counts)
+            indices = np.repeat(np.arange(valid.shape[0]), counts[valid])
+            if valid.shape[0] == 0:
+                return np.array([], dtype=object)
+            return shapely.linestrings(vertices[keep], indices=indices)
+
+        from shapely import geometry
+        lines = [geometry.LineString(vertices[offsets[i]:offsets[i + 1]]) for i in valid]
+        return np.array(lines, dtype=object)
+
 
-        return Path(result, color=self.color)
+    def _setFromLineStrings(self, lines):
+        import shapely
+        if hasattr(shapely, 'get_coordinates'):
+            coords, indices = shapely.get_coordinates(lines, return_index=True)
+            counts = np.bincount(indices, minlength=len(lines))
+        else:
+            coords = [np.asarray(line.coords)[:, :2] for line in lines]
+            counts = np.array([c.shape[0] for c in coords], dtype=np.intp)
+            coords = np.concatenate(coords) if len(coords) > 0 else np.zeros((0, 2))
+
+        offsets = np.zeros(counts.shape[0] + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+
+        self._pending = []
+        self._path = None
+        self._matrix = None
+        self._vertices = np.ascontiguousarray(coords[:, :2], dtype=float)
+        self._offsets = offsets
+        self._touch()
+        return self
 
 
     def getSimplify(self, tolerance = None):
-        from .Polyline import Polyline
+        try:
+            import shapely
+        except ImportError:
+            shapely = None
+
+        if shapely is None:
+            raise Exception('Path.getSimplify() requires Shapely')
+
+        if tolerance is None:
+            tolerance = self.head_width * 0.1
 
         result = Path(color=self.color)
-        for points in self.path:
-            if len(points) > 1:
-                result.add( Polyline( points ).getSimplify(tolerance) )
-        return result
+        if len(self) == 0:
+            return result
+
+        lines = self._getLineStrings()
+        if hasattr(shapely, 'simplify'):
+            lines = shapely.simplify(lines, tolerance, preserve_topology=False)
+            lines = lines[ shapely.length(lines) > 0 ]
+        else:
+            lines = [line.simplify(tolerance, preserve_topology=False) for line in lines]
+            lines = [line for line in lines if line.length > 0]
+
+        return result._setFromLineStrings(lines)
 
 
     def getResampledBySpacing(self, spacing, **kwargs):
-        from .Polyline import Polyline
+        """Resamples all polylines at once with a point every `spacing` units. The kwargs
+        go to the new Path (ex: color, head_width)"""
+        if spacing <= 0:
+            return self
 
-        result = Path(color=self.color)
-        for points in self.path:
-            if len(points) > 1:
-                result.add( Polyline( points, **kwargs ).getResampledBySpacing(spacing) )
-        return result
+        color = kwargs.pop('color', self.color)
+        vertices, offsets = resample_path(*self._pack(), spacing)
+        return Path(vertices=vertices, offsets=offsets, color=color, **kwargs)
     
 
     def splitByLength(self, length: float) -> list:
         """
         Split the Path into a list of Path objects, each with total length <= length.
         Splits can occur inside individual polylines by interpolating points.
-        """
-        from .Polyline import Polyline
 
+        The split points get inserted (twice, as the end of one piece and the start
+        of the next) into a single new vertex buffer and every piece is a view into it.
+        """
         if length <= 0:
             raise ValueError("length must be > 0")
 
+        vertices, offsets = self._pack()
+
+        # skip polylines with less than two points
+        counts = offsets[1:] - offsets[:-1]
+        if np.any(counts < 2):
+            keep = counts >= 2
+            index = np.repeat(keep, counts)
+            vertices = vertices[index]
+            offsets = np.concatenate([[0], np.cumsum(counts[keep])])
+
+        if vertices.shape[0] == 0:
+            return []
+
+        lengths = packed_lengths(vertices, offsets)
+        total = lengths[-1]
+        targets = np.arange(1, int(math.ceil(total / length))) * length
+        targets = targets[targets < total]
+
+        # Segment (j, j + 1) where each cut falls: lengths[j] < target <= lengths[j + 1]
+        j = np.searchsorted(lengths, targets, side='left') - 1
+        span = lengths[j + 1] - lengths[j]
+        t = ((targets - lengths[j]) / span)[:, None]
+        points = vertices[j] * (1.0 - t) + vertices[j + 1] * t
+
+        # Cuts right on a vertex don't need new points: an inner one ends a piece and
+        # starts the next one, and the end of a polyline just ends it
+        on_vertex = t[:, 0] == 1.0
+        at_end = on_vertex & np.isin(j + 1, offsets[1:] - 1)
+        insert = ~on_vertex
+        before = np.cumsum(insert) - insert
+
+        new_vertices = np.insert(vertices, np.repeat(j[insert] + 1, 2), np.repeat(points[insert], 2, axis=0), axis=0)
+
+        def newIndex(v):
+            return v + 2 * np.searchsorted(j[insert] + 1, v, side='right')
+
+        # Where every piece starts and ends (pieces cut on an inner vertex share it)
+        vertex = newIndex(j + 1)
+        starts = np.where(insert, j + 1 + 2 * before + 1, np.where(at_end, newIndex(j + 2), vertex))
+        ends = np.where(insert | at_end, starts, vertex + 1)
+        starts = np.concatenate([[0], starts])
+        ends = np.concatenate([ends, [new_vertices.shape[0]]])
+        new_offsets = newIndex(offsets)
+
         result = []
-        # current Path being built
-        current_path = Path(color=self.color)
-        current_len = 0.0
-        # current polyline points being built inside current_path
-        current_poly = None
-
-        for points in self.path:
-            if len(points) < 2:
-                continue
-            # work on a local mutable copy of the polyline points (tuples)
-            pts = [tuple(p) for p in points]
-
-            i = 0
-            while i < len(pts) - 1:
-                p0 = np.array(pts[i], dtype=float)
-                p1 = np.array(pts[i + 1], dtype=float)
-                edge_vec = p1 - p0
-                edge_len = math.hypot(edge_vec[0], edge_vec[1])
-
-                # if edge length is effectively zero, skip
-                if edge_len <= 1e-12:
-                    # Ensure we still carry forward the vertex
-                    if current_poly is None:
-                        current_poly = [tuple(p0)]
-                    # append the end point (even if same)
-                    current_poly.append(tuple(p1))
-                    i += 1
-                    continue
-
-                remaining_capacity = length - current_len
-
-                if edge_len <= remaining_capacity + 1e-12:
-                    # we can fit the whole edge into current_path
-                    if current_poly is None:
-                        current_poly = [tuple(p0)]
-                    current_poly.append(tuple(p1))
-                    current_len += edge_len
-                    i += 1
-                else:
-                    # need to split this edge: interpolate a point at t
-                    t = max(0.0, min(1.0, remaining_capacity / edge_len))
-                    split_pt = p0 + edge_vec * t
-                    # add segment up to split_pt into current_poly
-                    if current_poly is None:
-                        current_poly = [tuple(p0)]
-                    current_poly.append((float(split_pt[0]), float(split_pt[1])))
-
-                    # finalize current_path with this polyline
-                    if current_poly:
-                        current_path.add(current_poly)
-                        current_poly = None
-
-                    result.append(current_path)
-                    # start a new current_path
-                    current_path = Path(color=self.color)
-                    current_len = 0.0
-
-                    # replace pts[i] with split_pt so next iteration works on remaining edge
-                    pts[i] = (float(split_pt[0]), float(split_pt[1]))
-                    # do not increment i so next loop will process the remaining portion from split_pt -> original p1
-
-            # finished this input polyline; if we have an active current_poly, add it to current_path
-            if current_poly:
-                current_path.add(current_poly)
-                current_poly = None
-
-        # after processing all polylines, append the last current_path if it has data
-        if len(current_path.path) > 0:
-            result.append(current_path)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            inner = new_offsets[ np.searchsorted(new_offsets, start, side='right') : np.searchsorted(new_offsets, end, side='left') ]
+            local = np.concatenate([[start], inner, [end]]) - start
+            result.append( Path(vertices=new_vertices[start:end], offsets=local, color=self.color) )
 
         return result
 
 
     def getTransformed(self, func):
-        return Path([[func(x, y) for x, y in points] for points in self.path], color=self.color)
-
-
-    def getMoved(self, x, y, ax, ay):
-        bbox = self.bounds
-        x1, y1, x2, y2 = bbox.limits
-        dx = x1 + (x2 - x1) * ax - x
-        dy = y1 + (y2 - y1) * ay - y
-        return self.getTranslated(-dx, -dy)
+        if isinstance(func, Matrix):
+            # Lazy: share the buffers and just record the transformation
+            vertices, offsets = self._pack(bake=False)
+            path = Path(vertices=vertices, offsets=offsets, color=self.color)
+            if self._matrix is None:
+                path._matrix = func
+            else:
+                path._matrix = self._matrix.then(func)
 
+            # Translations and scales move the bounds along without looking at the vertices
+            if self._bounds is not None and func.isAxisAligned:
+                path._bounds = func.applyToLimits( self._bounds )
+            return path
 
-    def getCentered(self, width, height):
-        return self.getMoved(width / 2, height / 2, 0.5, 0.5)
+        vertices, offsets = self._pack()
+        vertices = np.array([func(x, y) for x, y in vertices.tolist()], dtype=float).reshape(-1, 2)
+        return Path(vertices=vertices, offsets=offsets, color=self.color)
 
 
     def getRotatedToFit(self, width, height, step=5):
@@ -584,13 +620,6 @@ class Path(Element):
         return None
 
 
-    def getScaledToFit(self, width, height, padding=0):
-        width -= padding * 2
-        height -= padding * 2
-        scale = min(width / self.width, height / self.height)
-        return self.getScaled(scale, scale).getCentered(width, height)
-
-
     def getRotateAndScaleToFit(self, width, height, padding=0, step=1):
         values = []
         width -= padding * 2
@@ -605,105 +634,110 @@ class Path(Element):
 
 
     def getSVGElementString(self):
-        path_str = ''
+        file = io.StringIO()
+        self.writeSVGElement(file)
+        return file.getvalue()
 
-        if len(self.path) == 0:
-            return path_str
 
-        # for points in self.path:
-        #     path_str += 'M' + ' L'.join('{0} {1}'.format(x,y) for x,y in points)
+    def writeSVGElement(self, file, chunk_size=65536):
+        """Writes the <path> element to an open file (or file-like object) formatting
+        the vertices in chunks, so big paths never get assembled as a single string"""
+        if len(self) == 0:
+            return
+
+        vertices, offsets = self._pack()
 
         if self.isTransformed:
-            for points in self.path:
-                first = True
-                for point in points:
-                    p = transform(point, translate=self.translate, scale=self.scale, rotate=self.rotate)
-                    if first:
-                        first = False
-                        path_str += 'M%0.1f %0.1f' % (p[0], p[1])
-                    else:
-                        path_str += 'L%0.1f %0.1f' % (p[0], p[1])
+            vertices = self.matrix.apply(vertices)
+            fmt_move, fmt_line = 'M%0.1f %0.1f', 'L%0.1f %0.1f'
         else:
-            for points in self.path:
-                path_str += 'M' + ' L'.join('{0} {1}'.format(x,y) for x,y in points)
+            # %r formats floats just like str() does
+            fmt_move, fmt_line = 'M%r %r', ' L%r %r'
 
-        svg_str = '<path '
+        file.write('<path ')
         if self.id != None:
-            svg_str += 'id="' + self.id + '" '
-        svg_str += 'd="' + path_str + '" '
-        svg_str += f'fill="none" stroke="{self.color}" stroke-width="{self.head_width}" '
-        svg_str += '/>\n'
-        
-        return svg_str
+            file.write('id="' + self.id + '" ')
+        file.write('d="')
 
+        # Every vertex is either the start of a polyline (M) or a line to (L)
+        starts = offsets[:-1][offsets[:-1] < offsets[1:]]
+        for i in range(0, vertices.shape[0], chunk_size):
+            chunk = vertices[i:i + chunk_size]
+            fmts = [fmt_line] * chunk.shape[0]
+            for j in (starts[(starts >= i) & (starts < i + chunk.shape[0])] - i).tolist():
+                fmts[j] = fmt_move
+            file.write(''.join(fmts) % tuple(chunk.ravel().tolist()))
 
-    def getGCodeString(self, **kwargs):
-        head_up_height = kwargs.pop('head_up_height', 3)
-        head_down_height = kwargs.pop('head_down_height', -0.5)
-        head_up_speed = kwargs.pop('head_up_speed', 800)
-        head_down_speed = kwargs.pop('head_down_speed', 500)
-        move_speed = kwargs.pop('move_speed', 300)
-        # bed_max_x = kwargs.pop('bed_max_x', 200)
-        # bed_max_y = kwargs.pop('bed_max_y', 200)
-
+        file.write('" ')
+        file.write(f'fill="none" stroke="{self.color}" stroke-width="{self.head_width}" ')
+        file.write('/>\n')
 
-        transformed = self.isTransformed
-        gcode_str = ''
-        for points in self.path:
-            gcode_str += "G0 Z%0.1f F" % (head_up_height) + str(head_up_speed) + "\n"
-            
-            p = points[0][:]
-            if transformed:
-                p = transform(points[0], translate=self.translate, scale=self.scale, rotate=self.rotate)
-                gcode_str += "G0 X%0.1f Y%0.1f\n" % (p[0], p[1])
-            else:
-                gcode_str += "G0 X%0.1f Y%0.1f\n" % (p[0], p[1])
 
-            gcode_str += "G1 Z%0.1f F" % (head_down_height) + str(head_down_speed) +"\n"
+    def getGCodeString(self, **kwargs):
+        file = io.StringIO()
+        self.writeGCode(file, **kwargs)
+        return file.getvalue()
 
-            first = True
-            for point in points[1:]:
-                # if x > 0 and x < bed_max_x and y > 0 and y < bed_max_y:  
-                p = point[:]
-                if transformed:
-                    p = transform(p, translate=self.translate, scale=self.scale, rotate=self.rotate)
-                gcode_str += "G1 X%0.1f Y%0.1f" % (p[0], p[1])
 
-                if first:
-                    gcode_str += " F" + str(move_speed)
-                    first = False
-                gcode_str += '\n'
+    def writeGCode(self, file, **kwargs):
+        """Writes the G-code to an open file (or file-like object). When a list of
+        `depths` is given the path is cut once per depth, formatting the XY moves
+        only once and changing just the Z line of every pass"""
+        head_down_height = kwargs.pop('head_down_height', -0.5)
+        depths = kwargs.pop('depths', [head_down_height])
+        head_down_speed = kwargs.get('head_down_speed', 500)
 
-        gcode_str += "G0 Z%0.1f\n" % (head_up_height)
-        return  gcode_str
+        pieces = self._getGCodePieces(**kwargs)
+        for z in depths:
+            z_str = "G1 Z%0.1f F" % (z) + str(head_down_speed) + "\n"
+            file.write(pieces[0])
+            for i in range(1, len(pieces), 4096):
+                file.write(z_str + z_str.join(pieces[i:i + 4096]))
 
-    def add_coords(self, coords, color=None, head_width=None, close=True):
-        """
-        Add a raw coordinate ring to the path without instantiating a Polyline object.
-        coords: iterable of (x,y) pairs or numpy array
-        color/head_width/close: optional metadata
-        """
-        # lazy init storage for lightweight rings (keeps memory smaller than full Polyline objects)
-        if not hasattr(self, '_rings'):
-            self._rings = []
-        # normalize coords to a plain Python list (fast) - avoid creating other objects
-        if hasattr(coords, 'tolist'):
-            pts = coords.tolist()
-        else:
-            pts = list(coords)
 
-        # store lightweight metadata for later use if needed
-        self._rings.append({
-            "points": pts,
-            "color": color if color is not None else getattr(self, "color", None),
-            "head_width": head_width if head_width is not None else getattr(self, "head_width", None),
-            "close": close
-        })
+    def _getGCodePieces(self, chunk_size=65536, **kwargs):
+        """Returns the G-code of one pass split where the head goes down, so
+        z_str.join(pieces) is the full pass for any 'G1 Z.. F..' line z_str"""
+        head_up_height = kwargs.pop('head_up_height', 3)
+        head_up_speed = kwargs.pop('head_up_speed', 800)
+        move_speed = kwargs.pop('move_speed', 300)
+        # bed_max_x = kwargs.pop('bed_max_x', 200)
+        # bed_max_y = kwargs.pop('bed_max_y', 200)
 
-        # Also append to the canonical storage used by existing Path consumers
-        # so methods like getSimplify/getSorted/getJoined see the new ring.
-        # Keep it as a plain list of points to remain compatible.
-        self.path.append(pts)
+        vertices, offsets = self._pack()
+        if self.isTransformed:
+            vertices = self.matrix.apply(vertices)
+
+        # Per vertex: the first of each polyline lifts the head and moves there
+        # (followed by a \0 where the head goes down), the second sets the speed
+        up_str = ("G0 Z%0.1f F" % (head_up_height) + str(head_up_speed) + "\n").replace('%', '%%')
+        fmt_first = up_str + "G0 X%0.1f Y%0.1f\n\0"
+        fmt_second = "G1 X%0.1f Y%0.1f F" + str(move_speed).replace('%', '%%') + "\n"
+        fmt_line = "G1 X%0.1f Y%0.1f\n"
+
+        starts = offsets[:-1][offsets[:-1] < offsets[1:]]
+        seconds = starts + 1
+        seconds = seconds[ np.isin(seconds, starts, invert=True) & (seconds < vertices.shape[0]) ]
+
+        pieces = []
+        carry = ''
+        for i in range(0, vertices.shape[0], chunk_size):
+            chunk = vertices[i:i + chunk_size]
+            fmts = [fmt_line] * chunk.shape[0]
+            for j in (seconds[(seconds >= i) & (seconds < i + chunk.shape[0])] - i).tolist():
+                fmts[j] = fmt_second
+            for j in (starts[(starts >= i) & (starts < i + chunk.shape[0])] - i).tolist():
+                fmts[j] = fmt_first
+            parts = (carry + ''.join(fmts) % tuple(chunk.ravel().tolist())).split('\0')
+            pieces.extend(parts[:-1])
+            carry = parts[-1]
+
+        pieces.append(carry + "G0 Z%0.1f\n" % (head_up_height))
+        return pieces
 
+    def add_coords(self, coords, color=None, head_width=None, close=True):
+        """Adds a raw coordinate ring (iterable of (x, y) pairs or numpy array) to the path 
+        without instantiating a Polyline object. color/head_width/close are ignored"""
+        self.add(coords)
         return self
 
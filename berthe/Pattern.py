@@ -10,6 +10,8 @@ import numpy as np
 
 from .Element import Element
 from .Image import Image
+from .Matrix import Matrix
+from .Sampler import Sampler
 from .tools import transform
 
 
@@ -98,10 +100,11 @@ class Pattern(Element):
         self.data = (x_rot + x_offset, y_rot + y_offset)
 
 
-    def _map(self, surface):
+    def _map(self, surface, mode=None):
         """Returns values on a surface for points on a pattern.
         Args:
-            surface (surface): the surface to trace along
+            surface (Sampler, Image or array): the surface to trace along
+            mode (str): 'nearest' or 'bilinear' (defaults to the sampler's mode)
         Returns:
             an array of surface heights for each point in the
             pattern. Line separators (i.e. values that are ``nan`` in
@@ -109,45 +112,20 @@ class Pattern(Element):
             will have the same dimensions as the x/y axes in the
             input pattern.
         """
+        if not isinstance(surface, Sampler):
+            surface = Sampler(surface)
+
         x, y = self.data
-        # surface_h, surface_w = surface.shape
-        surface_w, surface_h = surface.shape
-
-        # First, we convert the points along the pattern into integers within
-        # the bounds of the surface's index. The clipping here will also convert
-        # the nan values to 0.
-        surface_x = np.clip( np.int32(surface_w * x - 1e-9), 0, surface_w - 1)
-        surface_y = np.clip( np.int32(surface_h * y - 1e-9), 0, surface_h - 1)
-
-        # Grab z-values along the pattern path. Note that this will include values
-        # for every point, even if it is nan or had to be clipped to within the
-        # bounds of the surface, so we have to fix that next.
-        try:
-            surface_z = surface[surface_x, surface_y]
-        except IndexError:
-            print(surface_x, surface_y, surface_w, surface_h)
-
-        # # Set z-values that are either out of bounds or nan in the pattern to nan
-        # # in the output.
-        # # Numpy wants to warn about the fact that there are nan values in the
-        # # patterns, so we silence warnings about this.
-        # with np.errstate(invalid='ignore'):
-        #     surface_z[  (x < 0) | (x >= 1) |
-        #                 (y < 0) | (y >= 1)] = np.nan
-        
-        return surface_z
+        return surface.sample(x, y, mode)
 
 
     def project(self, surface, angle=0, offset=0,**kwargs):
+        sampling = kwargs.pop('sampling', None)
 
         # Map the pattern to get the Zs
-        if isinstance(surface, Image):
-            if surface.type == "grayscale":
-                z = self._map(surface.data.T)
-            elif surface.type == "mask":
-                return self.mask(surface)
-        else:
-            z = self._map(surface.T)
+        if isinstance(surface, Image) and surface.type == "mask":
+            return self.mask(surface)
+        z = self._map(surface, sampling)
 
         # Extract the Xs and Ys from the pattern
         x, y = self.data
@@ -166,6 +144,20 @@ class Pattern(Element):
         return self
 
 
+    def _valid(self):
+        x, y = self.data
+        return ~(np.isnan(x) | np.isnan(y))
+
+
+    def _contained(self, element, width, height):
+        """Which samples (scaled to width/height) are inside the element"""
+        x, y = self.data
+        valid = self._valid()
+        inside = np.zeros(x.shape[0], dtype=bool)
+        inside[valid] = element.contains( np.column_stack([x[valid] * width, y[valid] * height]) )
+        return inside
+
+
     def mask(self, element, width=None, height=None):
         x, y = self.data
 
@@ -175,33 +167,21 @@ class Pattern(Element):
             height = self.height
 
         if isinstance(element, Element):
-            N = x.shape[0]
-            z = np.zeros(N)
-            for i in range(N):
-                if np.isnan(x[i]) or np.isnan(y[i]):
-                    continue
-                pos = [x[i] * width, y[i] * height]
-                if not element.inside(pos):
-                    z[i] = np.nan
+            inside = self._contained(element, width, height)
+            z = np.zeros(x.shape[0])
+            z[ self._valid() & ~inside ] = np.nan
             self.data = (x, y + z)
 
         elif isinstance(element, Image):
             if element.type == "mask":
                 # mask self.data based on element.data
-                X_mask = np.int32( element.data.shape[1] * (x * width) / width - 1e-9 )
-                Y_mask = np.int32( element.data.shape[0] * (y * height) / height - 1e-9 )
-                for i in range(x.shape[0]):
-                    if np.isnan(x[i]) or np.isnan(y[i]):
-                        continue
-                    mx = X_mask[i]
-                    my = Y_mask[i]
-                    if mx < 0 or mx >= element.data.shape[1] or my < 0 or my >= element.data.shape[0]:
-                        self.data[0][i] = np.nan
-                        self.data[1][i] = np.nan
-                    else:
-                        if not element.data[my, mx]:
-                            self.data[0][i] = np.nan
-                            self.data[1][i] = np.nan
+                valid = self._valid()
+                X_mask = np.int32( element.data.shape[1] * (np.where(valid, x, 0.0) * width) / width - 1e-9 )
+                Y_mask = np.int32( element.data.shape[0] * (np.where(valid, y, 0.0) * height) / height - 1e-9 )
+                keep = (X_mask >= 0) & (X_mask < element.data.shape[1]) & (Y_mask >= 0) & (Y_mask < element.data.shape[0]) & valid
+                keep[keep] = element.data[Y_mask[keep], X_mask[keep]].astype(bool)
+                drop = valid & ~keep
+                self.data = (np.where(drop, np.nan, x), np.where(drop, np.nan, y))
 
             else:
                 raise Exception("Pattern: Masking Image is not a mask but a", element.type)
@@ -216,14 +196,8 @@ class Pattern(Element):
             height = self.height
 
         if isinstance(element, Element):
-            N = x.shape[0]
-            z = np.zeros(N)
-            for i in range(N):
-                if np.isnan(x[i]) or np.isnan(y[i]):
-                    continue
-                pos = [x[i] * width, y[i] * height]
-                if element.inside(pos):
-                    z[i] = np.nan
+            z = np.zeros(x.shape[0])
+            z[ self._contained(element, width, height) ] = np.nan
             self.data = (x, y + z)
 
         # elif isinstance(element, Image):
@@ -234,43 +208,36 @@ class Pattern(Element):
         #         raise Exception("Pattern: Masking Image is not a mask but a", element.type)
 
 
-    def getPoints(self):
-        X, Y = self.data
-        W, H = self.width, self.height
+    @property
+    def matrix(self):
+        return Matrix(translate=self.translate, rotate=self.rotate, scale=self.scale, anchor=self.center)
 
-        pts = []
-        for x, y in zip( *(X * W, Y * H) ):
-            if not np.isnan(x) and not np.isnan(y):
-                pts.append( transform( [x,y], rotate=self.rotate, scale=self.scale, translate=self.translate, anchor=self.center) )
 
-        return pts
+    def _getSamples(self):
+        """Returns the (N, 2) array of valid samples (scaled and transformed) and
+        the index where each run between NaN separators starts"""
+        X, Y = self.data
+        index = np.flatnonzero( self._valid() )
 
+        samples = np.column_stack([X[index] * self.width, Y[index] * self.height])
+        if self.isTransformed:
+            samples = self.matrix.apply(samples)
 
-    def getPath(self, **kwargs):
-        from .Path import Path
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(index) > 1) + 1]) if index.shape[0] > 0 else np.zeros(0, dtype=np.intp)
+        return samples, starts
 
-        X, Y = self.data
-        W, H = self.width, self.height
 
-        pts = []
-        path = []
-        draw = False
-        for x, y in zip( *(X * W, Y * H) ):
-            if np.isnan(x) or np.isnan(y):
-                if draw and len(pts) > 0:
-                    path.append( pts[:] )
-                draw = False
-            else:
-                if not draw:
-                    pts = [] 
-                    draw = True
-                pts.append( transform( [x,y], rotate=self.rotate, scale=self.scale, translate=self.translate, anchor=self.center) )
+    def getPoints(self):
+        samples, starts = self._getSamples()
+        return samples.tolist()
 
-        if draw and len(pts) > 0:
-            path.append( pts[:] )
 
+    def _getPath(self, **kwargs):
+        from .Path import Path
 
-        path = Path(path)
+        samples, starts = self._getSamples()
+        offsets = np.append(starts, samples.shape[0])
+        path = Path( vertices=samples, offsets=offsets )
 
         optimize = kwargs.pop('optimize', False)
         if optimize:
@@ -289,6 +256,7 @@ class Pattern(Element):
         width = kwargs.pop('width', self.width)
         height = kwargs.pop('height', self.height)
         threshold = kwargs.pop('threshold', 0.5)
+        sampling = kwargs.pop('sampling', None)
 
         transformed = self.isTransformed
 
@@ -296,14 +264,9 @@ class Pattern(Element):
         gcode_str += "G0 Z%0.1f F" % (head_up_height) + str(head_up_speed) + "\n"
         
         # Map the pattern to get the Zs
-        if isinstance(surface, Image):
-            if surface.type == "grayscale":
-                Z = self._map(surface.data.T)
-
-            elif surface.type == "mask":
-                return self.mask(surface)
-        else:
-            Z = self._map(surface.T)
+        if isinstance(surface, Image) and surface.type == "mask":
+            return self.mask(surface)
+        Z = self._map(surface, sampling)
 
         # Extract the Xs and Ys from the pattern
         X, Y = self.data
@@ -7,8 +7,10 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import math
+import numpy as np
+
 from .Polyline import Polyline
-from .tools import pointInside
+from .tools import pointInside, pointsInside
 
 class Polygon(Polyline):
     def __init__( self, points=None, holes=None, **kwargs):
@@ -63,6 +65,7 @@ class Polygon(Polyline):
                 self.holes.append( points )
             else:
                 self.holes.append( Polyline(points, close=True) )
+            self.dirty = True
         else:
             print("Polygon.addHole(): Not enough points for a hole", points)
 
@@ -78,3 +81,12 @@ class Polygon(Polyline):
 
         return False
 
+
+    def contains( self, points ):
+        result = pointsInside( points, self.getPoints() )
+        for hole in self.holes:
+            if not result.any():
+                break
+            result[result] &= ~hole.contains( np.asarray(points, dtype=float).reshape(-1, 2)[result] )
+        return result
+
@@ -10,16 +10,56 @@ import math
 import numpy as np
 
 from .Element import Element
-from .tools import lerp, distance, remap, transform, normalize, perpendicular, clamp, dot, linesIntersection
+from .Matrix import Matrix
+from .tools import lerp, distance, remap, transform, clamp, linesIntersection, interpolate_lengths
+
+
+def _normalize(v, tolerance=0.00001):
+    """Row by row version of tools.normalize() over a (N, 2) array (zero vectors stay zero)"""
+    mag2 = v[:, 0] * v[:, 0] + v[:, 1] * v[:, 1]
+    mag = np.sqrt(mag2)
+    scale = (np.abs(mag2 - 1.0) > tolerance) & (mag != 0.0)
+    return np.where(scale[:, None], v / np.where(mag == 0.0, 1.0, mag)[:, None], v)
+
+
+def _getInsetRings(polygon, distances):
+    """Returns the coordinates of the rings (exteriors and then interiors) of the shapely polygon 
+    inset by each of the distances, in order, stopping at the first one that leaves nothing"""
+    import shapely
+
+    if hasattr(shapely, 'buffer'):
+        insets = shapely.buffer(polygon, -distances, quad_segs=16)
+        empty = shapely.is_empty(insets) | (shapely.area(insets) == 0)
+        if empty.any():
+            insets = insets[:np.argmax(empty)]
+        parts = shapely.get_parts(insets)
+        rings = shapely.get_rings(parts)
+        coords, indices = shapely.get_coordinates(rings, return_index=True)
+        counts = np.bincount(indices, minlength=len(rings))
+        return [ring for ring in np.split(coords, np.cumsum(counts)[:-1]) if ring.shape[0] >= 3]
+
+    rings = []
+    for d in distances:
+        inset = polygon.buffer(-d)
+        if inset.is_empty or inset.area == 0:
+            break
+        for poly in getattr(inset, 'geoms', [inset]):
+            for ring in [poly.exterior] + list(poly.interiors):
+                coords = np.asarray(ring.coords)[:, :2]
+                if coords.shape[0] >= 3:
+                    rings.append( coords )
+    return rings
 
 
 class Polyline(Element):
+    _uncached = Element._uncached + ('normals', 'tangents', 'lengths')
+
     def __init__( self, points=None, **kwargs):
         Element.__init__(self, **kwargs);
         self.points = []
-        self.normals = []
-        self.tangents = []
-        self.lengths = []
+        self.normals = np.zeros((0, 2))
+        self.tangents = np.zeros((0, 2))
+        self.lengths = np.zeros(0)
         self.holes = None
         self.dirty = True
         self.anchor = kwargs.pop('anchor', [0.0, 0.0])
@@ -28,7 +68,6 @@ class Polyline(Element):
         if points != None:            
             if isinstance(points, Polyline):
                 self.points = points.points
-                self.dirty = points.dirty
                 self.close = kwargs.pop('close', points.close)
 
                 self.translate = kwargs.pop('translate', points.translate)
@@ -67,6 +106,11 @@ class Polyline(Element):
         return self.getPerimeter()
 
 
+    @property
+    def matrix(self):
+        return Matrix(translate=self.translate, rotate=self.rotate, scale=self.scale, anchor=self.anchor)
+
+
     def next(self):
         return self.__next__()
 
@@ -82,84 +126,55 @@ class Polyline(Element):
             return None
 
     
-    def _calcData(self, index): #, angle, rotation):
-        normal = [0.0, 0.0]
-        tangent = [0.0, 0.0]
-
-        if self.size() < 2:
-            return normal, tangent
-
-        if index == 0:
-            try:
-                normal = perpendicular(self.points[0], self.points[1])
-            except TypeError:
-                print(">> perp p0 and p1 ", self.points[0], self.points[1], 'from', self.points)
-        elif index == self.size():
-            try:
-                normal = perpendicular(self.points[-2], self.points[-1])
-            except TypeError:
-                print(">> perp p-2 and p-1", self.points[-2], self.points[-1], 'from', self.points)
-        else:
-            i1 = self.getWrappedIndex( index - 1 )
-            i2 = self.getWrappedIndex( index     )
-            i3 = self.getWrappedIndex( index + 1 )
-
-            p1 = self.points[i1]
-            p2 = self.points[i2]
-            p3 = self.points[i3]
+    def _calcData(self, points):
+        """Normals and tangents of every point (as (N, 2) arrays). The ends only get 
+        the normal of their segment, the rest come from the central differences"""
+        N = points.shape[0]
+        normals = np.zeros((N, 2))
+        tangents = np.zeros((N, 2))
 
-            v1 = [p1[0] - p2[0], p1[1] - p2[1]] # vector to previous point
-            v2 = [p3[0] - p2[0], p3[1] - p2[1]]  # vector to next point
+        # Ends: perpendicular to the first and last segments
+        for i, (a, b) in ((0, (0, 1)), (N - 1, (N - 2, N - 1))):
+            d = _normalize( (points[b] - points[a])[None, :] )[0]
+            normals[i] = [-d[1], d[0]]
 
-            v1 = normalize(v1);
-            v2 = normalize(v2);
+        if N > 2:
+            p2 = points[1:-1]
+            v1 = _normalize( points[:-2] - p2 )     # vector to previous point
+            v2 = _normalize( points[2:] - p2 )      # vector to next point
 
-            # If just one of p1, p2, or p3 was identical, further calculations 
-            # are (almost literally) pointless, as v1 or v2 will then contain 
-            # NaN values instead of floats.
-            segmentHasZeroLength = v1 is None or v2 is None
+            # If one of the segments has zero length the normal and tangent are left at zero
+            valid = np.any(v1 != 0.0, axis=1) & np.any(v2 != 0.0, axis=1)
 
-            if not segmentHasZeroLength:
-                if distance(v2, v1) > 0.0:
-                    tangent  = normalize(v2 - v1)
-                else:
-                    tangent = -v1
+            diff = v2 - v1
+            tangent = np.where( (np.hypot(diff[:, 0], diff[:, 1]) > 0.0)[:, None], _normalize(diff), -v1 )
+            normal = _normalize( np.column_stack([-tangent[:, 1], tangent[:, 0]]) )
 
-                normal = normalize( [-tangent[1], tangent[0]] )
-                # rotation = np.cross( v1, v2 )
-                # angle    = math.pi - math.acos( clamp( np.dot( v1, v2 ), -1.0, 1.0 ) )
+            tangents[1:-1] = np.where(valid[:, None], tangent, 0.0)
+            normals[1:-1] = np.where(valid[:, None], normal, 0.0)
 
-        return normal, tangent
+        return normals, tangents
 
 
     def _updateCache(self):
-        # Clean
-        self.lengths = []
-        self.tangents = []
-        self.normals = []
-        N = len(self.points)
+        points = np.asarray(self.points, dtype=float)
+        N = points.shape[0]
 
-        # Check
         if N < 2:
+            self.lengths = np.zeros(0)
+            self.tangents = np.zeros((0, 2))
+            self.normals = np.zeros((0, 2))
             return self
 
-        # Process
-        length = 0
-        for i in range( N - 1 ):
-            self.lengths.append(length)
-            p1 = self.points[i]
-            p2 = self.points[i+1]
-            length += distance(p1, p2)
+        points = points.reshape(N, -1)[:, :2]
 
-            normal, tangent = self._calcData(i)
-            self.normals.append(normal)
-            self.tangents.append(tangent)
+        # Length along the polyline at each point
+        segments = np.hypot(*np.diff(points, axis=0).T)
+        self.lengths = np.concatenate([[0.0], np.cumsum(segments)])
+        self.normals, self.tangents = self._calcData(points)
 
-        normal, tangent = self._calcData(N)
-        self.normals.append(normal)
-        self.tangents.append(tangent)
-
-        self.dirty = False
+        # Straight to the dict, going through __setattr__ would drop the paths cached by getPath()
+        self.__dict__['dirty'] = False
 
 
     def size(self):
@@ -178,7 +193,7 @@ class Polyline(Element):
 
         
     def arcTo( self, pos, radius, **kwargs ):
-        if self.size > 0:
+        if self.size() > 0:
             from .Arc import Arc
             self.points.extend( Arc(self.points[-1], pos, radius, **kwargs ).getPoints()[1:] )
             self.dirty = True
@@ -187,7 +202,7 @@ class Polyline(Element):
 
 
     def cubicBezierTo( self, control1, control2, end, **kwargs ):
-        if self.size > 0:
+        if self.size() > 0:
             from .CubicBezier import CubicBezier
             self.points.extend( CubicBezier(self.points[-1], control1, control2, end, **kwargs ).getPoints()[1:] )
             self.dirty = True
@@ -216,38 +231,19 @@ class Polyline(Element):
         if len(self.lengths) < 1:
             return 0
         
-        return self.lengths[-1]
+        return float(self.lengths[-1])
 
 
     def getIndexAtLength(self, length):
         totalLength = self.getPerimeter()
-        length = max(min(length, totalLength), 0)
-    
-        # lastPointIndex = (len(self.points) - 1, len(self.points))[self.isClosed]
-        lastPointIndex = len(self.points) - 1
-
-        i1 = max(min(int(math.floor(length / totalLength * lastPointIndex)), len(self.lengths)-2), 0) # start approximation here
-        leftLimit = 0
-        rightLimit = lastPointIndex
-        
-        distAt1 = 0.0
-        distAt2 = 0.0
-        for iterations in range(32):
-            i1 = max(min(int(i1), len(self.lengths)-1), 0)
-            distAt1 = self.lengths[i1]
-
-            if distAt1 <= length:         # if Length at i1 is less than desired Length (this is good)
-                distAt2 = self.lengths[i1+1]
-                if distAt2 >= length:
-                    t = remap(length, distAt1, distAt2, 0.0, 1.0)
-                    return i1 + t
-                else:
-                    leftLimit = i1
-            else:
-                rightLimit = i1
-            i1 = (leftLimit + rightLimit) // 2
+        if len(self.lengths) < 2:
+            return 0
 
-        return 0
+        length = max(min(length, totalLength), 0)
+        i1 = int(np.searchsorted(self.lengths, length, side='right')) - 1
+        i1 = max(min(i1, len(self.lengths) - 2), 0)
+        t = remap(length, self.lengths[i1], self.lengths[i1 + 1], 0.0, 1.0)
+        return i1 + t
 
 
     def getInterpolationParams(self, findex):
@@ -286,32 +282,35 @@ class Polyline(Element):
 
 
     def getNormalAtIndex(self, index):
-        if self.points.size() < 2:
+        if self.size() < 2:
             return self
 
         if self.dirty:
             self._updateCache()
 
         if self.isTransformed:
-            return transform(p, self.normals[ self.getWrappedIndex(index) ], rotate=self.rotate )
+            return transform(self.normals[ self.getWrappedIndex(index) ], rotate=self.rotate )
         else:
             return self.normals[ self.getWrappedIndex(index) ]
 
 
     def getNormalAtIndexInterpolated(self, findex):
-        if self.points.size() < 2:
+        if self.size() < 2:
             return self
 
         i1, i2, t = self.getInterpolationParams(findex)
-        return lerp(self.getNormalAtIndex(i1), self.getNormalAtIndex[i2], t)
+        return lerp(self.getNormalAtIndex(i1), self.getNormalAtIndex(i2), t)
 
 
     def getTangentAtIndex(self, index):
-        if self.points.size() < 2:
+        if self.size() < 2:
             return self
 
+        if self.dirty:
+            self._updateCache()
+
         if self.isTransformed:
-            return transform(p, self.tangents[ self.getWrappedIndex(index) ], rotate=self.rotate )
+            return transform(self.tangents[ self.getWrappedIndex(index) ], rotate=self.rotate )
         else:
             return self.tangents[ self.getWrappedIndex(index) ]
 
@@ -319,19 +318,35 @@ class Polyline(Element):
     def getTangentAtIndexInterpolated(self, findex):
         # if(points.size() < 2) return T();
         i1, i2, t = self.getInterpolationParams(findex)
-        return lerp(self.getTangentAtIndex(i1), self.getTangentAtIndex[i2], t)
+        return lerp(self.getTangentAtIndex(i1), self.getTangentAtIndex(i2), t)
+
+
+    def getPointsAtLengths(self, lengths):
+        """Batch version of getPointAtLength() for an array of lengths. Returns a (N, 2) array"""
+        if self.dirty:
+            self._updateCache()
+
+        lengths = np.asarray(lengths, dtype=float).reshape(-1)
+        if len(self.lengths) < 2:
+            return np.zeros((0, 2))
+
+        lengths = np.clip(lengths, 0.0, self.lengths[-1])
+        points = np.asarray(self.points, dtype=float)
+        points = interpolate_lengths(points.reshape(points.shape[0], -1)[:, :2], self.lengths, lengths)
+
+        if self.isTransformed:
+            points = self.matrix.apply(points)
+
+        return points
 
 
     def getResampledBySpacing(self, spacing):
-        if spacing==0 or (self.points) == 0:
+        if spacing <= 0 or len(self.points) == 0:
             return self
 
         poly = Polyline( stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=self.close, color=self.color )
         totalLength = self.getPerimeter()
-        f = 0.0
-        while f < totalLength:
-            poly.lineTo( self.getPointAtLength(f) )
-            f += spacing
+        poly.points = self.getPointsAtLengths( np.arange(0.0, totalLength, spacing) ).tolist()
 
         # if not self.isClosed:
         #     if poly.size() > 0:
@@ -351,32 +366,22 @@ class Polyline(Element):
         startLength = max( min(startLength, totalLength), 0.0)
         endLength = max( min(endLength, totalLength), 0.0)
 
-        f = startLength
-        while f < endLength:
-            poly.lineTo( self.getPointAtLength(f) )
-            f += 0.1  # step
-
-        # Add last point
-        if poly.size() > 0:
-            poly.points[-1] = self.getPointAtLength(endLength)
+        # One point every 0.1 (step) and the last one right at endLength
+        lengths = np.arange(startLength, endLength, 0.1)
+        if lengths.shape[0] > 0:
+            lengths[-1] = endLength
+        poly.points = self.getPointsAtLengths( lengths ).tolist()
 
         return poly
 
     def splitByLength(self, length: float) -> list:
+        """Splits the polyline into pieces of (at most) the given length"""
+        from .Path import Path
+
         polylines = []
-        totalLength = self.getPerimeter()
-        f = 0.0
-        current_poly = Polyline( stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=False, color=self.color )
-        while f < totalLength:
-            current_poly.lineTo( self.getPointAtLength(f) )
-            f += length
-            if f < totalLength:
-                polylines.append( current_poly )
-                current_poly = Polyline( stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=False, color=self.color )
-        # Add last
-        if current_poly.size() > 0:
-            current_poly.lineTo( self.getPointAtLength(totalLength) )
-            polylines.append( current_poly )
+        for path in Path([ self.getPoints() ]).splitByLength(length):
+            for points in path._iterPolylines():
+                polylines.append( Polyline( points.tolist(), stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=False, color=self.color ) )
         return polylines
 
 
@@ -395,31 +400,24 @@ class Polyline(Element):
         if self.dirty:
             self._updateCache()
 
-        points = []
-
-        if self.size() < 2:
-            return Polyline(points, stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=self.close, color=self.color )
-
-        for i in range(self.size()):
-            width = offset
+        points = np.asarray(self.points, dtype=float)
+        points = points.reshape(points.shape[0], -1)[:, :2]
+        norm = _normalize(self.normals)
 
-            norm = normalize(self.normals[i])
-
-            # TODO:
-            #       FIX MITER
-            #       Refs: https://github.com/tangrams/tangram/blob/master/src/builders/polylines.js
-            if i != 0:
-                prevN = normalize(self.normals[i-1])
-                mitter = 2.0 / (1.0 + dot(norm, prevN) )
-                try:
-                    scale = math.sqrt(mitter)
-                except ValueError:
-                    raise Exception("SQRT out of domain", norm, prevN, mitter)
-                width *= scale
+        # TODO:
+        #       FIX MITER
+        #       Refs: https://github.com/tangrams/tangram/blob/master/src/builders/polylines.js
+        width = np.full(points.shape[0], float(offset))
+        mitter = 2.0 / (1.0 + np.einsum('ij,ij->i', norm[1:], norm[:-1]))
+        if np.any(mitter < 0.0):
+            raise Exception("SQRT out of domain", mitter)
+        width[1:] *= np.sqrt(mitter)
+
+        points = points + norm * width[:, None]
+        if self.isTransformed:
+            points = self.matrix.apply(points)
 
-            p = [self.points[i][0] + norm[0] * width, self.points[i][1] + norm[1] * width]
-            points.append( transform(p, rotate=self.rotate, scale=self.scale, translate=self.translate, anchor=self.anchor) )
-        return Polyline(points, stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=self.close, color=self.color )
+        return Polyline(points.tolist(), stroke_width=self.stroke_width, fill=self.fill, head_width=self.head_width, close=self.close, color=self.color )
 
 
     def _toShapelyGeom(self):
@@ -511,6 +509,14 @@ class Polyline(Element):
         return Path(path)
 
 
+    def _getFillRings(self):
+        rings = [ self.getPoints() ]
+        if self.holes != None:
+            for hole in self.holes:
+                rings.append( hole.getPoints() )
+        return rings
+
+
     def getFillPath(self, **kwargs):
         from .Path import Path
 
@@ -528,70 +534,22 @@ class Polyline(Element):
             return self
 
         polygon = self._toShapelyPolygon()
-        
-         # initial inset (may produce Polygon, MultiPolygon or empty)
-        current = polygon.buffer(-head_width / 2.0 - offset)
-        # If empty geometry, return empty Path
-        if getattr(current, "is_empty", False) or getattr(current, "area", 0) == 0:
-            return Path()
 
-        path = Path(head_width=head_width, color=self.color)
-
-        # print("   Initiated fill path generation.")
+        # Every ring is inset from the original polygon (eroding by a and then by b is 
+        # the same as eroding by a + b), so the buffers don't get more complex on each 
+        # step and shapely 2 computes all of them in one call. Nothing is left past
+        # half of the smallest side of the bounding box.
+        start = head_width / 2.0 + offset
+        step = head_width * (1 - overlap)
+        min_x, min_y, max_x, max_y = polygon.bounds
+        last = min(max_x - min_x, max_y - min_y) * 0.5
+        distances = start + step * np.arange(max(int(math.ceil((last - start) / step)), 0) + 1)
+        rings = _getInsetRings(polygon, distances)
+
+        if len(rings) == 0:
+            return Path()
 
-        # Try to import shapely geometry types if available
-        try:
-            from shapely.geometry import Polygon, MultiPolygon
-        except Exception:
-            Polygon = None
-            MultiPolygon = None
-
-        # helper: iterate over polygon-like geometries in a robust way
-        def _iter_polygons(geom):
-            if geom is None:
-                return
-            # If geometry has geoms (MultiPolygon, GeometryCollection), iterate children
-            if hasattr(geom, "geoms"):
-                for g in geom.geoms:
-                    yield g
-                return
-            # If it's a Polygon instance (when shapely imported), yield it
-            if Polygon is not None and isinstance(geom, Polygon):
-                yield geom
-                return
-            # Fallback: try to iterate directly (older shapely/other geometry types)
-            try:
-                for g in geom:
-                    yield g
-            except Exception:
-                return
-            
-        # helper: add polygon exterior and interiors to path (safely)
-        def _add_polygon_to_path(poly):
-            if poly is None:
-                return
-            exterior = getattr(poly, "exterior", None)
-            if exterior is not None:
-                coords = list(exterior.coords)
-                if len(coords) >= 3:
-                    # avoid allocating a Polyline object for every ring
-                    path.add_coords(coords, color=self.color, head_width=self.head_width, close=True)
-            for interior in getattr(poly, "interiors", []):
-                coords = list(interior.coords)
-                if len(coords) >= 3:
-                    path.add_coords(coords, color=self.color, head_width=self.head_width, close=True)
-
-        # add initial rings
-        for poly in _iter_polygons(current):
-            _add_polygon_to_path(poly)
-
-        # iteratively inset and collect rings
-        while True:
-            current = current.buffer(-head_width * (1 - overlap))
-            if getattr(current, "is_empty", False) or getattr(current, "area", 0) == 0:
-                break
-            for poly in _iter_polygons(current):
-                _add_polygon_to_path(poly)
+        path = Path(rings, head_width=head_width, color=self.color)
 
         if simplify:
             path = path.getSimplify()
@@ -700,6 +658,8 @@ class Polyline(Element):
 
 
     def getTransformed(self, func):
+        if isinstance(func, Matrix):
+            return Polyline(func.apply(self.getPoints()).tolist(), color=self.color )
         return Polyline([func(x, y) for x, y in self.getPoints()], color=self.color )
 
 
@@ -707,8 +667,7 @@ class Polyline(Element):
         points = []
 
         if self.isTransformed:
-            for p in self.points:
-                points.append( transform(p, rotate=self.rotate, scale=self.scale, translate=self.translate, anchor=self.anchor) )
+            points = self.matrix.apply(self.points).tolist()
         else:
             points = self.points
 
@@ -719,8 +678,8 @@ class Polyline(Element):
         return points
 
 
-    def getPath(self, **kwargs):
-        path = Element.getPath(self, **kwargs)
+    def _getPath(self, **kwargs):
+        path = Element._getPath(self, **kwargs)
 
         if self.holes != None:
             for poly in self.holes:
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import numpy as np
+
+
+def _strOrder(boxes, capacity):
+    """Sort-Tile-Recursive order of a (N, 4) array of boxes: sliced by the x of their
+    centers into vertical strips of whole nodes, and sorted by y inside each strip"""
+    n = boxes.shape[0]
+    nodes = int(math.ceil(n / capacity))
+    strip = int(math.ceil(math.sqrt(nodes))) * capacity
+
+    by_x = np.argsort(boxes[:, 0] + boxes[:, 2], kind='stable')
+    strips = np.empty(n, dtype=np.intp)
+    strips[by_x] = np.arange(n) // strip
+    return np.lexsort((boxes[:, 1] + boxes[:, 3], strips))
+
+
+class RTree(object):
+    """Static R-tree (bulk loaded with STR) over a (N, 4) array of boxes given as
+    (min_x, min_y, max_x, max_y). Boxes are referred by their handle (their position
+    on the original array).
+
+    Every level keeps the boxes of its nodes and the range of the level below each
+    one covers, so a search walks down level by level filtering whole arrays.
+    Empty boxes (min > max) are never found.
+    """
+    def __init__( self, boxes, **kwargs):
+        self.capacity = max(int(kwargs.pop('capacity', 16)), 2)
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.size = boxes.shape[0]
+
+        # Leaves: the boxes themselves
+        self.handles = _strOrder(boxes, self.capacity) if self.size > 0 else np.zeros(0, dtype=np.intp)
+        self.boxes = boxes[self.handles]
+
+        # Nodes from the bottom up, as (boxes, start, end) of their children on the level below
+        self.levels = []
+        level = self.boxes
+        while level.shape[0] > self.capacity:
+            start = np.arange(0, level.shape[0], self.capacity)
+            end = np.minimum(start + self.capacity, level.shape[0])
+            nodes = np.hstack([ np.minimum.reduceat(level[:, :2], start, axis=0),
+                                np.maximum.reduceat(level[:, 2:], start, axis=0) ])
+
+            order = _strOrder(nodes, self.capacity)
+            self.levels.append( (nodes[order], start[order], end[order]) )
+            level = nodes[order]
+
+
+    def search(self, limits):
+        """Returns the (sorted) handles of the boxes overlapping the box (min_x, min_y, max_x, max_y)"""
+        min_x, min_y, max_x, max_y = limits
+
+        def overlaps(boxes):
+            return (boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x) & (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y)
+
+        if len(self.levels) > 0:
+            nodes = np.arange(self.levels[-1][0].shape[0])
+        else:
+            nodes = np.arange(self.size)
+
+        for boxes, start, end in reversed(self.levels):
+            nodes = nodes[ overlaps(boxes[nodes]) ]
+            counts = end[nodes] - start[nodes]
+            nodes = np.repeat(start[nodes] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        nodes = nodes[ overlaps(self.boxes[nodes]) ]
+        return np.sort(self.handles[nodes])
+
+
+    def searchPoint(self, point):
+        """Returns the (sorted) handles of the boxes containing the point"""
+        return self.search( (point[0], point[1], point[0], point[1]) )
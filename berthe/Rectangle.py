@@ -22,7 +22,7 @@ class Rectangle(Element):
 
     def inside( self, pos ):
         if self.isTransformed:
-            return Element.inside(self, pos, self.getPoints() )
+            return Element.inside(self, pos)
         elif (pos[0] > self.center[0] - self.size[0] * 0.5) and (pos[0] < self.center[0] + self.size[0] * 0.5):
             if (pos[1] > self.center[1] - self.size[1] * 0.5) and (pos[1] < self.center[1] + self.size[1] * 0.5):
                 return True
@@ -30,6 +30,17 @@ class Rectangle(Element):
         return False
 
 
+    def contains( self, points ):
+        if self.isTransformed:
+            return Element.contains(self, points)
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x = points[:, 0]
+        y = points[:, 1]
+        return  (x > self.center[0] - self.size[0] * 0.5) & (x < self.center[0] + self.size[0] * 0.5) & \
+                (y > self.center[1] - self.size[1] * 0.5) & (y < self.center[1] + self.size[1] * 0.5)
+
+
     @property
     def center(self):
         return self._center + self.translate
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from .Image import Image
+
+
+class Sampler(object):
+    """Samples a heightmap on normalized (0.0 - 1.0) x/y coordinates.
+
+    Keeps a contiguous copy of the height array (rows are y, columns are x), so it
+    can be built once and reused to project many patterns on the same surface.
+    Modes: 'nearest' (default) or 'bilinear'.
+    """
+    def __init__( self, data, mode='nearest' ):
+        if isinstance(data, Sampler):
+            mode = data.mode
+            data = data.data
+        elif isinstance(data, Image):
+            data = data.data
+
+        self.data = np.ascontiguousarray(data, dtype=float)
+        self.height, self.width = self.data.shape[:2]
+        self.mode = mode
+
+
+    def sample(self, x, y, mode=None):
+        """Returns the heights for the arrays of x, y. Points that are nan are
+        sampled on the corner of the surface (the caller keeps them as separators)"""
+        if mode is None:
+            mode = self.mode
+
+        if mode == 'nearest':
+            return self.nearest(x, y)
+        elif mode == 'bilinear':
+            return self.bilinear(x, y)
+        else:
+            raise Exception("Sampler: unknown sampling mode", mode)
+
+
+    def _clamp(self, values, size, shift):
+        values = np.multiply(values, size, dtype=float)
+        values -= shift
+        # Separators land on 0 (clipping with nans around is also a lot slower)
+        values[ np.isnan(values) ] = 0.0
+        return np.clip(values, 0, size - 1, out=values)
+
+
+    def nearest(self, x, y):
+        i = self._clamp(x, self.width, 1e-9).astype(np.intp)
+        j = self._clamp(y, self.height, 1e-9).astype(np.intp)
+        j *= self.width
+        j += i
+        return self.data.ravel().take(j)
+
+
+    def bilinear(self, x, y):
+        # Pixels values are on their centers
+        u = self._clamp(x, self.width, 0.5)
+        v = self._clamp(y, self.height, 0.5)
+        i0 = u.astype(np.intp)
+        j0 = v.astype(np.intp)
+        i1 = np.minimum(i0 + 1, self.width - 1)
+        j1 = np.minimum(j0 + 1, self.height - 1)
+        tu = u - i0
+        tv = v - j0
+
+        flat = self.data.ravel()
+        row0 = j0 * self.width
+        row1 = j1 * self.width
+        top = flat.take(row0 + i0) * (1.0 - tu) + flat.take(row0 + i1) * tu
+        bottom = flat.take(row1 + i0) * (1.0 - tu) + flat.take(row1 + i1) * tu
+        return top * (1.0 - tv) + bottom * tv
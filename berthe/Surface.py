@@ -6,12 +6,25 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from .Group import *
-from .Image import *
-# from .Pattern import *
-# from .Polyline import Polyline
+import copy
+import numpy as np
+
+from .Group import Group
+from .Path import Path
+from .Matrix import Matrix
+from .tools import parse_transform_matrix, parse_svg_path, svg_shape_path
+
+
+def _getElementPath(task):
+    # Runs on the worker processes of Surface._getElementsPaths()
+    el, simplify, sort = task
+    path = el.getPath()
+    if simplify:
+        path = path.getSimplify()
+    if sort:
+        path = path.getSorted()
+    return path
 
-from .tools import dom2dict
 
 class Surface(Group):
     def __init__(self, size = 'A3', **kwargs):
@@ -66,135 +79,291 @@ class Surface(Group):
         return [self.width * 0.5, self.height * 0.5]
         
 
-    def fromSVG(self, filename: str) -> None:
-        # TODO:
-        #  - Add CubicBezier, QuadraticBezier support
-        #  - Resolve nested and element transformations
-        #  - Parse correctly the SVG
+    def _getPageMatrix(self, margin=[0.0, 0.0], flip_x=False, flip_y=False):
+        # Translates by margin and mirrors inside the page
+        matrix = Matrix()
+
+        if margin[0] != 0.0 or margin[1] != 0.0: 
+            matrix = matrix.translate(margin[0], margin[1])
+
+        if flip_x:
+            matrix = matrix.scale(-1.0, 1.0).translate(self.width, 0.0)
+
+        if flip_y:
+            matrix = matrix.scale(1.0, -1.0).translate(0.0, self.height)
+
+        return matrix
+
+
+    def _getOriginMatrix(self, path, auto_center=True, flip_x=False, flip_y=False):
+        # Moves the center of path to the origin and mirrors around it
+        matrix = Matrix()
+
+        if auto_center:
+            cx, cy = path.bounds.center
+            matrix = matrix.translate(-cx, -cy)
 
-        from xml.dom.minidom import parse
-        doc = parse(filename)
-        doc.nodeValue
+        if flip_x:
+            matrix = matrix.scale(-1.0, 1.0)
 
-        svg = doc.getElementsByTagName('svg')[0]
-        svg_att = dom2dict(svg) 
-        viewBox = svg_att['viewBox'].split()
-        width = float(viewBox[2])
-        height = float(viewBox[3])
+        if flip_y:
+            matrix = matrix.scale(1.0, -1.0)
 
-        scale = 'scale(' + str((1.0/width) * self.width) + ',' + str((1.0/height) * self.height) + ')'
-        stroke_width = max(width/self.width, height/self.height ) * 0.2
+        return matrix
 
-        root_group = self.group( filename )
-        root_group.parseSVGNode( svg )
 
+    def _getElementsPaths(self, workers, top=(False, False), nested=(False, False)):
+        """Returns a copy of the elements tree where every element that is not a group was
+        replaced by its path, generated on a pool of `workers` processes. `top` and `nested`
+        are the (simplify, sort) options for the top level and the grouped elements"""
+        from concurrent.futures import ProcessPoolExecutor
 
-    def toSVG(self, filename: str, **kwargs ) -> None:
+        tasks = []
+        def collect(elements, options):
+            for el in elements:
+                if isinstance(el, Group):
+                    collect(el.elements, nested)
+                else:
+                    # don't send the parent (and with it the whole surface) to the workers
+                    el = copy.copy(el)
+                    el.parent = None
+                    tasks.append( (el,) + tuple(options) )
+        collect(self.elements, top)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            paths = iter( list(executor.map(_getElementPath, tasks, chunksize=max(1, len(tasks) // (workers * 4)))) )
+
+        def rebuild(elements):
+            result = []
+            for el in elements:
+                if isinstance(el, Group):
+                    grp = copy.copy(el)
+                    grp.elements = rebuild(el.elements)
+                    new_groups = dict( (id(old), new) for old, new in zip(el.elements, grp.elements) if isinstance(old, Group) )
+                    grp.subgroups = dict( (key, new_groups.get(id(g), g)) for key, g in el.subgroups.items() )
+                    result.append(grp)
+                else:
+                    result.append( next(paths) )
+            return result
+
+        return rebuild(self.elements)
+
+
+    def fromSVG(self, filename, **kwargs) -> None:
+        """Imports the shapes of an SVG file (or file-like object) into a new group. When it
+        has a viewBox it gets scaled (keeping its aspect ratio) to fit the surface.
+
+        The document is streamed (never loaded whole as a DOM): nested transforms are 
+        resolved with a stack of matrices and every shape is flattened straight into
+        packed vertices. Consecutive shapes with the same style get merged into a
+        single Path (unless merge=False)"""
+        import xml.etree.ElementTree as ET
+
+        merge = kwargs.pop('merge', True)
+        resolution = kwargs.pop('resolution', 100)
+
+        # Elements whose content is not drawn directly
+        skip_tags = ('defs', 'metadata', 'title', 'desc', 'clipPath', 'mask', 'marker', 'pattern', 'symbol', 'style')
+
+        root_group = self.group( str(getattr(filename, 'name', filename if isinstance(filename, str) else 'svg')) )
+
+        # One entry per open element: (element, group, matrix, style) 
+        stack = []
+        # Shapes waiting to be merged into a Path: (group, style, [(vertices, offsets)])
+        pending = [None, None, []]
+        skip = 0
+
+        def flush():
+            group, style, chunks = pending
+            if len(chunks) > 0:
+                vertices = np.concatenate([v for v, o in chunks])
+                offsets = [np.zeros(1, dtype=np.intp)]
+                start = 0
+                for v, o in chunks:
+                    offsets.append(o[1:] + start)
+                    start += o[-1]
+                fill, stroke_width, color, id = style
+                group.add( Path(vertices=vertices, offsets=np.concatenate(offsets), 
+                                id=id, fill=fill, stroke_width=stroke_width, color=color) )
+            pending[:] = [None, None, []]
+
+        for event, node in ET.iterparse(filename, events=('start', 'end')):
+            tag = node.tag.rsplit('}', 1)[-1]
+
+            if event == 'end':
+                if tag == 'g':
+                    flush()
+                if tag in skip_tags:
+                    skip -= 1
+                stack.pop()
+                # Drop what was already parsed so memory doesn't grow with the document
+                node.clear()
+                if len(stack) > 0:
+                    stack[-1][0].remove(node)
+                continue
+
+            if len(stack) == 0:
+                matrix = Matrix()
+                viewBox = node.attrib.get('viewBox', None)
+                if viewBox is not None:
+                    min_x, min_y, width, height = [float(v) for v in viewBox.replace(',', ' ').split()]
+                    # Scaled to fit and centered, as the default preserveAspectRatio (xMidYMid meet)
+                    scale = min(self.width / width, self.height / height)
+                    matrix = matrix.translate(-min_x, -min_y).scale(scale, scale)
+                    matrix = matrix.translate((self.width - width * scale) * 0.5, (self.height - height * scale) * 0.5)
+                stack.append( (node, root_group, matrix, (root_group.fill, root_group.stroke_width, root_group.color)) )
+                continue
+
+            parent, group, matrix, style = stack[-1]
+
+            if tag in skip_tags:
+                skip += 1
+            if skip > 0:
+                stack.append( (node, group, matrix, style) )
+                continue
+
+            att = node.attrib
+            if 'transform' in att:
+                matrix = Matrix( parse_transform_matrix(att['transform']) ).then( matrix )
+
+            fill, stroke_width, color = style
+            fill = att.get('fill', fill)
+            stroke_width = att.get('stroke-width', stroke_width)
+            if att.get('stroke', 'none') != 'none':
+                color = att['stroke']
+            style = (fill, stroke_width, color)
+
+            if tag == 'g':
+                flush()
+                group = group.add( Group(att.get('id', group.id + "_sub"), fill=fill, stroke_width=stroke_width, color=color) )
+                stack.append( (node, group, matrix, style) )
+                continue
+
+            stack.append( (node, group, matrix, style) )
+
+            d = svg_shape_path(tag, att)
+            if d is None:
+                continue
+            vertices, offsets = parse_svg_path(d, resolution)
+            if offsets.shape[0] < 2:
+                continue
+            vertices = matrix.apply(vertices)
+
+            key = style + (group.id + "_sub" if merge else att.get('id', group.id + "_sub"),)
+            if not merge or pending[0] is not group or pending[1] != key:
+                flush()
+                pending[0] = group
+                pending[1] = key
+            pending[2].append( (vertices, offsets) )
+
+        flush()
+        return root_group
+
+
+    def toSVG(self, filename, **kwargs ) -> None:
+        """Writes the surface as SVG to filename (or to an open file-like object).
+        Elements are streamed one by one through a buffered writer"""
         scale = kwargs.pop('scale', 1.0)
         margin = kwargs.pop('margin', [0.0, 0.0])
         unit = kwargs.pop('unit', 'mm')
         optimize = kwargs.pop('optimize', False)
         flip_x = kwargs.pop('flip_x', False)
         flip_y = kwargs.pop('flip_y', False)
+        buffer_size = kwargs.pop('buffer_size', 1 << 20)
+        workers = kwargs.pop('workers', None)
+
+        elements = self.elements
+        if workers is not None and workers > 1:
+            # Generate the paths of all elements in parallel (already optimized)
+            elements = self._getElementsPaths(workers, top=(optimize, optimize))
+            optimize = False
 
+        if hasattr(filename, 'write'):
+            self._writeSVG(filename, elements, scale, margin, unit, optimize, flip_x, flip_y)
+        else:
+            with open(filename, "w", buffering=buffer_size) as file:
+                self._writeSVG(file, elements, scale, margin, unit, optimize, flip_x, flip_y)
+
+
+    def _writeSVG(self, file, elements, scale, margin, unit, optimize, flip_x, flip_y):
         svg_str = '<?xml version="1.0" encoding="utf-8" ?>\n<svg '
         svg_str += 'width="'+ str(self.width) + unit + '" '
         svg_str += 'height="' + str(self.height) + unit + '" '
         svg_str += 'viewBox="0,0,'+ str(self.width * scale) + ',' + str(self.height * scale) + '" '
         svg_str += 'baseProfile="tiny" version="1.2" xmlns="http://www.w3.org/2000/svg" xmlns:ev="http://www.w3.org/2001/xml-events" xmlns:xlink="http://www.w3.org/1999/xlink" ><defs/>'
+        file.write(svg_str)
 
-        for el in self.elements:
+        # margin and flips collapse into a single matrix applied once per element
+        matrix = self._getPageMatrix(margin, flip_x, flip_y)
+
+        for el in elements:
 
             if isinstance(el, Group ):
                 grp = el
 
-                if margin[0] != 0.0 or margin[1] != 0.0: 
-                    grp = grp.getTranslated(margin[0], margin[1])
-
-                if flip_x:
-                    def flip_onX(x, y):
-                        return (self.width - x, y)
-                    grp = grp.getTransformed(flip_onX)
-
-                if flip_y:
-                    def flip_onY(x, y):
-                        return (x, self.height - y)
-                    grp = grp.getTransformed(flip_onY)
+                if not matrix.isIdentity:
+                    grp = grp.getTransformed(matrix)
 
-                svg_str += grp.getSVGElementString()
+                grp.writeSVGElement(file)
             else:
                 path = el.getPath()
 
                 if optimize:
                     path = path.getSimplify().getSorted()
 
-                if margin[0] != 0.0 or margin[1] != 0.0: 
-                    path = path.getTranslated(margin[0], margin[1])
+                if not matrix.isIdentity:
+                    path = path.getTransformed(matrix)
 
-                if flip_x:
-                    def flip_onX(x, y):
-                        return (self.width - x, y)
-                    path = path.getTransformed(flip_onX)
+                path.writeSVGElement(file)
 
-                if flip_y:
-                    def flip_onY(x, y):
-                        return (x, self.height - y)
-                    path = path.getTransformed(flip_onY)
+        file.write('</svg>')
 
-                svg_str += path.getSVGElementString()
 
-        svg_str += '</svg>'
-
-        with open(filename, "w") as file:
-            file.write(svg_str)
-
-
-    def toGCODE(self, filename: str, **kwargs ) -> None:
+    def toGCODE(self, filename, **kwargs ) -> None:
+        """Writes the surface as G-code to filename (or to an open file-like object),
+        cutting down to `depth` in passes of `depth_step`"""
         flip_x = kwargs.pop('flip_x', False)
         flip_y = kwargs.pop('flip_y', True)
         auto_center = kwargs.pop('auto_center', True)
         depth = kwargs.pop('depth', -1.0)
         depth_step = kwargs.pop('depth_step', -0.2)
         head_width = kwargs.pop('head_width', self.head_width)
+        buffer_size = kwargs.pop('buffer_size', 1 << 20)
         # head_width_at_depth = kwargs.pop('head_width_at_depth', head_width)
 
-        def getGCODEHeader(self, **kwargs):
+        def getGCODEHeader(**kwargs):
             return 'M3\n'
 
-        def getGCODEFooter(self, **kwargs):
+        def getGCODEFooter(**kwargs):
             gcode_str = "G0 Z10\n"
             gcode_str += "G0 X0 Y0\n"
             gcode_str += "M5\n"
             return gcode_str
 
-        gcode_str = getGCODEHeader()
-
         # Initial shallow and precise pass
         path = self.getPath().getSimplify().getSorted()
 
-        if auto_center:
-            path = path.getCentered(self.width, self.height)
-            path = path.getTranslated(-self.width*0.5, -self.height*0.5)
-
-        if flip_x:
-            def flip_onX(x, y):
-                return (-x, y)
-            path = path.getTransformed(flip_onX)
-
-        if flip_y:
-            def flip_onY(x, y):
-                return (x, -y)
-            path = path.getTransformed(flip_onY)
+        # centering and flips collapse into a single matrix applied once
+        matrix = self._getOriginMatrix(path, auto_center, flip_x, flip_y)
+        if not matrix.isIdentity:
+            path = path.getTransformed(matrix)
 
+        depths = []
         z = depth_step
         while z > depth:
-            gcode_str += path.getGCodeString(head_down_height=z, **kwargs)
+            depths.append(z)
             z += depth_step
 
-        gcode_str += getGCODEFooter()
+        def write(file):
+            file.write(getGCODEHeader())
+            path.writeGCode(file, depths=depths, **kwargs)
+            file.write(getGCODEFooter())
 
-        with open(filename, "w") as file:
-            file.write(gcode_str)
+        if hasattr(filename, 'write'):
+            write(filename)
+        else:
+            with open(filename, "w", buffering=buffer_size) as file:
+                write(file)
 
 
     def toPNG(self, filename: str, **kwargs) -> None:
@@ -215,6 +384,14 @@ class Surface(Group):
         show_bounds = kwargs.pop('show_bounds', False)
         debug = kwargs.pop('debug', False)
         optimize = kwargs.pop('optimize', False)
+        workers = kwargs.pop('workers', None)
+
+        elements = self.elements
+        if workers is not None and workers > 1:
+            # Generate the paths of all elements in parallel (already simplified and sorted)
+            elements = self._getElementsPaths(workers, top=(optimize, sort), nested=(optimize, sort))
+            optimize = False
+            sort = False
 
         margin *= scale
         width = int(scale * self.width)
@@ -232,6 +409,8 @@ class Surface(Group):
             dc.rectangle(0, 0, self.width ,self.height)
             dc.stroke()
 
+        matrix = self._getPageMatrix(margin, flip_x, flip_y)
+
         def draw_path(dc, path):
             if optimize:
                 path = path.getSimplify()
@@ -239,18 +418,8 @@ class Surface(Group):
             if sort:
                 path = path.getSorted()
                 
-            if margin[0] != 0.0 or margin[1] != 0.0: 
-                path = path.getTranslated(margin[0], margin[1])
-
-            if flip_x:
-                def flip_onX(x, y):
-                    return (self.width - x, y)
-                path = path.getTransformed(flip_onX)
-
-            if flip_y:
-                def flip_onY(x, y):
-                    return (x, self.height - y)
-                path = path.getTransformed(flip_onY)        
+            if not matrix.isIdentity:
+                path = path.getTransformed(matrix)
 
             lastPoint = [0.0, 0.0]
             # convert SVG color to RGB
@@ -293,10 +462,11 @@ class Surface(Group):
                     lastPoint = [x, y]
                 dc.stroke()
 
-        for el in self.elements:
+        for el in elements:
             if isinstance(el, Group ):
                 grp = el
                 for el in grp.elements:
+                    el = grp._getTransformedElement(el)
                     if isinstance(el, Path ):
                         draw_path(dc, el)
                     else:
@@ -341,19 +511,10 @@ class Surface(Group):
         if optimize:
             path = path.getSimplify().getSorted()
 
-        if auto_center:
-            path = path.getCentered(self.width, self.height)
-            path = path.getTranslated(-self.width*0.5, -self.height*0.5)
-
-        if flip_x:
-            def flip_onX(x, y):
-                return (-x, y)
-            path = path.getTransformed(flip_onX)
-
-        if flip_y:
-            def flip_onY(x, y):
-                return (x, -y)
-            path = path.getTransformed(flip_onY)
+        # centering and flips collapse into a single matrix applied once
+        matrix = self._getOriginMatrix(path, auto_center, flip_x, flip_y)
+        if not matrix.isIdentity:
+            path = path.getTransformed(matrix)
 
         lastIndex = 0
         for points in path:
@@ -391,19 +552,10 @@ class Surface(Group):
         if optimize:
             path = path.getSimplify().getSorted()
 
-        if auto_center:
-            path = path.getCentered(self.width, self.height)
-            path = path.getTranslated(-self.width*0.5, -self.height*0.5)
-
-        if flip_x:
-            def flip_onX(x, y):
-                return (-x, y)
-            path = path.getTransformed(flip_onX)
-
-        if flip_y:
-            def flip_onY(x, y):
-                return (x, -y)
-            path = path.getTransformed(flip_onY)
+        # centering and flips collapse into a single matrix applied once
+        matrix = self._getOriginMatrix(path, auto_center, flip_x, flip_y)
+        if not matrix.isIdentity:
+            path = path.getTransformed(matrix)
 
         curvedata = bpy.data.curves.new(name="path", type='CURVE')  
         curvedata.dimensions = '3D'  
@@ -9,9 +9,8 @@ from __future__ import unicode_literals
 from .Element import Element
 from .Polyline import Polyline
 from .Path import Path
-from .Bbox import Bbox
-from .hershey_fonts import *
-from .tools import transform
+from .Matrix import Matrix
+from .tools import transform, unpack_path
 
 class Text(Element):
     def __init__( self, text, center, **kwargs ):
@@ -19,7 +18,11 @@ class Text(Element):
         self.text = str(text)
         self._center = center
 
+        # The fonts module is loaded with the first text
+        from .hershey_fonts import FUTURAL, HersheyFont
         self.font =  kwargs.pop('font', FUTURAL)
+        if not isinstance(self.font, HersheyFont):
+            self.font = HersheyFont('custom', self.font)
         self.spacing =  kwargs.pop('spacing', 0)
         self.extra =  kwargs.pop('extra', 0)
         self.auto_flip = kwargs.pop('auto_flip', False )
@@ -32,15 +35,8 @@ class Text(Element):
 
     @property
     def length(self):
-        x = 0
-        for ch in self.text:
-            index = ord(ch) - 32
-            if index < 0 or index >= 96:
-                x += self.spacing
-                continue
-
-            lt, rt, coords = self.font[index]
-            x += rt - lt + self.spacing
+        index, advance = self.font.advances(self.text, self.spacing)
+        x = float(advance.sum())
 
         if isinstance(self.scale, tuple) or isinstance(self.scale, list):
             x *= self.scale[0]
@@ -50,10 +46,10 @@ class Text(Element):
         return x
 
 
-    def getPolylines(self, **kwargs):
+    def _getLayout(self, **kwargs):
+        """Packed (vertices, offsets) of the strokes of the text centered on its center"""
         rotate = kwargs.pop('rotate', self.rotate )
-        stroke_width = kwargs.pop('stroke_width', self.stroke_width )
-        
+
         if self.auto_flip:
             if rotate >= 90 and rotate < 270:
                 rotate += 180
@@ -61,47 +57,25 @@ class Text(Element):
                 rotate += 180
 
         # Based on hershey implementation by Michael Fogleman https://github.com/fogleman/axi/blob/master/axi/hershey.py
-        result = []
-
-        bbox = Bbox()
-        x = 0
-        for ch in self.text:
-            index = ord(ch) - 32
-            if index < 0 or index >= 96:
-                x += self.spacing
-                continue
-
-            lt, rt, coords = self.font[index]
-            for path in coords:
-                path = [ (x + i - lt, j) for i, j in path]
-                if path:
-                    line = Polyline(path)
-                    bbox.join( line.bounds )
-                    result.append( line )
-            x += rt - lt + self.spacing
-            if index == 0:
-                x += self.extra
-
-        toCenter = transform(bbox.center, rotate=rotate, scale=self.scale)
+        # The glyphs come already laid out (and their bounding box from their metrics) from the font
+        vertices, offsets, bbox = self.font.layout(self.text, self.spacing, self.extra)
+        if vertices.shape[0] == 0:
+            return vertices, offsets
+
+        toCenter = transform([ (bbox[0] + bbox[2]) * 0.5, (bbox[1] + bbox[3]) * 0.5 ], rotate=rotate, scale=self.scale)
         translate = [ self.center[0] - toCenter[0], self.center[1] - toCenter[1] ]
+        return Matrix(translate=translate, rotate=rotate, scale=self.scale).apply(vertices), offsets
 
-        polys = []
-        for line in result:
-            points = []
-            for point in line.points:
-                points.append( transform(point, translate=translate, rotate=rotate, scale=self.scale) )
-            polys.append( Polyline(points, stroke_width=stroke_width) )
 
-        return polys
+    def getPolylines(self, **kwargs):
+        stroke_width = kwargs.pop('stroke_width', self.stroke_width )
+        vertices, offsets = self._getLayout(**kwargs)
+        return [ Polyline(points, stroke_width=stroke_width, head_width=self.head_width) for points in unpack_path(vertices, offsets) ]
 
 
     def getPoints(self):
-        points = []
-        polys = self.getPolylines( stroke_width=self.head_width )
-
-        for poly in polys:
-            points.extend( poly.getPoints() )
-        return points
+        vertices, offsets = self._getLayout()
+        return vertices.tolist()
 
 
     def _toShapelyGeom(self):
@@ -123,6 +97,7 @@ class Text(Element):
 
     def getBuffer(self, offset):
         if offset <= 0.0:
+            import copy
             return copy.copy(self)
 
         from .Polygon import Polygon
@@ -158,6 +133,11 @@ class Text(Element):
         
 
     def getStrokePath(self, **kwargs):
+        # Thin strokes are just the glyphs, only the thick ones need a Polyline per stroke to offset
+        if kwargs.get('stroke_width', self.stroke_width) <= self.head_width:
+            vertices, offsets = self._getLayout(**kwargs)
+            return Path(vertices=vertices, offsets=offsets)
+
         path = Path()
         polys = self.getPolylines(**kwargs)
 
@@ -1,8 +1,14 @@
 # outer __init__.py
+#
+# The classes are imported right away (PIL is only loaded with the images), the fonts,
+# converters and pattern generators on their first use (PEP 562).
+
+import importlib
 
 # Surface Class
 from .Surface import Surface
 from .Element import Element
+from .Matrix import Matrix
 
 # Elements Class
 from .Line import Line
@@ -17,14 +23,67 @@ from .Polyline import Polyline
 from .Polygon import Polygon
 
 from .Text import Text
-from .hershey_fonts import *
 
 from .Group import Group
 
 from .Path import Path
 
 from .Image import Image
-from .convert import *
 
 from .Pattern import Pattern
-from .pattern_generators import *
\ No newline at end of file
+from .Sampler import Sampler
+
+from .tools import transform
+
+_EAGER = [ value.__name__ for value in (Surface, Element, Matrix, Line, Rectangle, CubicBezier, Arc, Circle,
+                                        Polyline, Polygon, Text, Group, Path, Image, Pattern, Sampler, transform) ]
+
+_LAZY = {
+    # convert
+    'ImageDrawingToPath': 'convert',
+    'ImageSurfaceCoorners': 'convert',
+    'ImageContourToPath': 'convert',
+    'ImageThresholdToPolygons': 'convert',
+    'GrayscaleToPattern': 'convert',
+    'HeightmapToPattern': 'convert',
+
+    # pattern_generators
+    'stripes_pattern': 'pattern_generators',
+    'grid_pattern': 'pattern_generators',
+    'crosses_pattern': 'pattern_generators',
+    'dashes_pattern': 'pattern_generators',
+    'hex_pattern': 'pattern_generators',
+    'spiral_pattern': 'pattern_generators',
+
+    # hershey_fonts
+    'HersheyFont': 'hershey_fonts',
+    'FONTS': 'hershey_fonts',
+    'FONTS_NAMES': 'hershey_fonts',
+    'FONTS_SCALE': 'hershey_fonts',
+    'save_fonts': 'hershey_fonts',
+}
+
+
+def _fontsNames():
+    # Every font is also a public name, but they are only listed on their module
+    return importlib.import_module('.hershey_fonts', __name__).FONTS_NAMES
+
+
+def __getattr__(name):
+    if name == '__all__':
+        return _EAGER + list(_LAZY) + _fontsNames()
+
+    if name in _LAZY:
+        module = _LAZY[name]
+    elif name.isupper() and name in _fontsNames():
+        module = 'hershey_fonts'
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted( set(globals()) | set(__getattr__('__all__')) )
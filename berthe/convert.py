@@ -214,13 +214,14 @@ def GrayscaleToPattern(grayscale, **kwargs):
     pattern = kwargs.pop('pattern', None)
     pattern_angle = float(kwargs.pop('pattern_angle', 0.0))
     mask = kwargs.pop('mask', None)
+    dither_kernel = kwargs.pop('dither_kernel', 'atkinson')
 
     # Make surface to carve from (copy from gradient to get same dinesions)
     surface = grayscale.copy()
     surface.fill(1.0)
 
     # Make gradient into dither mask
-    grayscale.dither(threshold=threshold, invert=invert)
+    grayscale.dither(threshold=threshold, invert=invert, kernel=dither_kernel)
     surface = surface - grayscale
 
     # Load and remove Mask
@@ -252,12 +253,14 @@ def GrayscaleToPattern(grayscale, **kwargs):
 def HeightmapToPattern(filename, **kwargs):
     grayscale = kwargs.pop('grayscale', None)
     camera_angle = float(kwargs.pop('camera_angle', 10.0))
+    sampling = kwargs.pop('sampling', 'nearest')
 
     threshold = float(kwargs.pop('threshold', 0.5))
     invert = kwargs.pop('invert', False)
     pattern = kwargs.pop('pattern', None)
     pattern_angle = float(kwargs.pop('pattern_angle', 0.0))
     mask = kwargs.pop('mask', None)
+    dither_kernel = kwargs.pop('dither_kernel', 'atkinson')
 
     # Load heightmap
     heightmap = Image(filename)
@@ -272,7 +275,7 @@ def HeightmapToPattern(filename, **kwargs):
     # Load gradient into dither mask
     if grayscale is not None:
         gradientmap = Image( grayscale )
-        heightmap = heightmap - gradientmap.dither(threshold=threshold, invert=invert)
+        heightmap = heightmap - gradientmap.dither(threshold=threshold, invert=invert, kernel=dither_kernel)
 
     # Create pattern
     if pattern is None:
@@ -286,6 +289,6 @@ def HeightmapToPattern(filename, **kwargs):
     if pattern_angle > 0:
         pattern.turn(pattern_angle)
 
-    pattern.project(heightmap, camera_angle)
+    pattern.project(heightmap, camera_angle, sampling=sampling)
 
     return pattern
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from .Index import nearest_neighbours
+
+# Local search over the order (and direction) in which a plotter draws a set of polylines
+# to reduce the pen-up travel between them. The first polyline is kept in place.
+#
+# Polyline p (of n) is drawn from its head to its tail. Its endpoints have the handles
+# p (start) and p + n (end) over the concatenation of starts and ends, so the head of p
+# is p + n * flip[p] and its tail the other one.
+
+def travel_length(starts, ends, order=None, reverse=None):
+    """Pen-up distance to draw the polylines with the given starts/ends in order"""
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    if order is not None:
+        starts = starts[order]
+        ends = ends[order]
+    if reverse is not None:
+        reverse = np.asarray(reverse, dtype=bool)[:, None]
+        starts, ends = np.where(reverse, ends, starts), np.where(reverse, starts, ends)
+    if starts.shape[0] < 2:
+        return 0.0
+    delta = starts[1:] - ends[:-1]
+    return float(np.hypot(delta[:, 0], delta[:, 1]).sum())
+
+
+def optimize_travel(starts, ends, **kwargs):
+    """Improves the order in which a set of polylines are drawn using 2-opt (reversing
+    a run of polylines) and Or-opt (moving a run of up to 3 polylines somewhere else,
+    optionally reversed) moves.
+
+    Only the moves that connect an endpoint with one of its `neighbours` closest
+    endpoints (approximated, see nearest_neighbours) are tried, so every pass is close 
+    to linear. It stops when no move improves the travel or after `time_budget` seconds,
+    finding the neighbours included.
+
+    Returns (order, reverse) arrays and the travel before and after.
+    """
+    start_time = time.time()
+    time_budget = kwargs.pop('time_budget', 5.0)
+    reversable = kwargs.pop('reversable', True)
+    neighbours = kwargs.pop('neighbours', 8)
+    order = kwargs.pop('order', None)
+    reverse = kwargs.pop('reverse', None)
+
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    n = starts.shape[0]
+
+    tour = np.arange(n, dtype=np.intp) if order is None else np.array(order, dtype=np.intp)
+    flip = np.zeros(n, dtype=bool)
+    if reverse is not None:
+        flip[tour] = np.asarray(reverse, dtype=bool)
+
+    before = travel_length(starts, ends, tour, flip[tour])
+    if n < 3:
+        return tour, flip[tour], before, before
+
+    deadline = start_time + time_budget
+
+    points = np.concatenate([starts, ends])
+    nbrs = nearest_neighbours(points, neighbours).tolist()
+    X = points[:, 0].tolist()
+    Y = points[:, 1].tolist()
+
+    pos = np.empty(n, dtype=np.intp)
+    pos[tour] = np.arange(n)
+
+    def dist(a, b):
+        return math.hypot(X[a] - X[b], Y[a] - Y[b])
+
+    def head(p):
+        return p + n if flip[p] else p
+
+    def tail(p):
+        return p if flip[p] else p + n
+
+    def reverseRun(i, j):
+        # Draw the polylines on positions [i, j] in the opposite order and direction
+        run = tour[i:j + 1][::-1].copy()
+        tour[i:j + 1] = run
+        flip[run] ^= True
+        pos[run] = np.arange(i, j + 1)
+
+    def moveRun(i, L, k, backwards):
+        # Move the polylines on positions [i, i + L) after the one on position k
+        run = tour[i:i + L].copy()
+        if backwards:
+            run = run[::-1]
+            flip[run] ^= True
+        if k > i:
+            lo, hi = i, k + 1
+            tour[lo:hi] = np.concatenate([tour[i + L:k + 1], run])
+        else:
+            lo, hi = k + 1, i + L
+            tour[lo:hi] = np.concatenate([run, tour[k + 1:i]])
+        pos[tour[lo:hi]] = np.arange(lo, hi)
+
+    def tryMoves(b):
+        i = pos[b]
+        if i == 0:
+            return None
+        a = tour[i - 1]
+        ta = tail(a)
+        hb = head(b)
+        d_ab = dist(ta, hb)
+
+        if reversable:
+            # 2-opt: reverse the run [i, j] so tail(a) connects with the tail of t[j]
+            for c in nbrs[ta]:
+                if c < 0:
+                    break
+                q = c % n
+                j = pos[q]
+                if j < i or c != tail(q):
+                    continue
+                gain = d_ab - dist(ta, c)
+                if j + 1 < n:
+                    hn = head(tour[j + 1])
+                    gain += dist(c, hn) - dist(hb, hn)
+                if gain > 1e-9:
+                    reverseRun(i, j)
+                    return (i - 1, j + 1)
+
+            # 2-opt: reverse the run [j, i) so head(b) connects with the head of t[j]
+            for c in nbrs[hb]:
+                if c < 0:
+                    break
+                q = c % n
+                j = pos[q]
+                if j < 1 or j >= i or c != head(q):
+                    continue
+                tp = tail(tour[j - 1])
+                gain = d_ab + dist(tp, c) - dist(tp, ta) - dist(c, hb)
+                if gain > 1e-9:
+                    reverseRun(j, i - 1)
+                    return (j - 1, i)
+
+        # Or-opt: move the run [i, i + L) after another polyline
+        for L in (1, 2, 3):
+            if i + L > n:
+                break
+            tr = tail(tour[i + L - 1])
+            removed = d_ab
+            if i + L < n:
+                hn = head(tour[i + L])
+                removed += dist(tr, hn) - dist(ta, hn)
+
+            for backwards in ((False, True) if reversable else (False,)):
+                first, last = (tr, hb) if backwards else (hb, tr)
+                for c in nbrs[first]:
+                    if c < 0:
+                        break
+                    q = c % n
+                    k = pos[q]
+                    if (k >= i - 1 and k < i + L) or c != tail(q):
+                        continue
+                    added = dist(c, first)
+                    if k + 1 < n:
+                        hk = head(tour[k + 1])
+                        added += dist(last, hk) - dist(c, hk)
+                    if removed - added > 1e-9:
+                        moveRun(i, L, k, backwards)
+                        return (min(i, k) - 1, max(i + L, k + 1))
+
+        return None
+
+    # Polylines waiting to have the pen-up travel that ends on them checked
+    queue = deque(tour.tolist())
+    queued = np.ones(n, dtype=bool)
+    while queue and time.time() < deadline:
+        b = queue.popleft()
+        queued[b] = False
+        changed = tryMoves(b)
+        if changed is None:
+            continue
+
+        # Check again the polylines around the changed connections
+        queue.appendleft(b)
+        queued[b] = True
+        for p in changed:
+            for s in (p - 1, p, p + 1, p + 2):
+                if s >= 0 and s < n and not queued[tour[s]]:
+                    queued[tour[s]] = True
+                    queue.append(tour[s])
+
+    return tour, flip[tour], before, travel_length(starts, ends, tour, flip[tour])
@@ -6,7 +6,9 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import re
 import math
+import warnings
 import numpy as np
 
 # Basic trigonometry
@@ -124,6 +126,424 @@ def path_length(path):
     return sum([points_length(path) for path in path], 0)
 
 
+def pack_path(path):
+    """Packs a list of polylines into one contiguous (N, 2) float64 vertex
+    buffer plus an array of N+1 offsets where each polyline starts/ends."""
+    counts = [len(points) for points in path]
+    offsets = np.zeros(len(counts) + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+
+    if offsets[-1] == 0:
+        return np.zeros((0, 2)), offsets
+
+    vertices = np.concatenate([np.asarray(points, dtype=float).reshape(len(points), -1)[:, :2] for points in path if len(points) > 0])
+    return np.ascontiguousarray(vertices), offsets
+
+
+def unpack_path(vertices, offsets):
+    """Returns the list of polylines (list of [x, y] lists) of a packed buffer"""
+    points = vertices.tolist()
+    bounds = offsets.tolist()
+    return [points[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def packed_lengths(vertices, offsets):
+    """Length travelled with the head down at every vertex of a packed buffer
+    (the jumps between polylines don't count)"""
+    if vertices.shape[0] == 0:
+        return np.zeros(0)
+    segments = np.hypot(*np.diff(vertices, axis=0).T)
+    jumps = offsets[1:-1]
+    segments[ jumps[(jumps > 0) & (jumps < vertices.shape[0])] - 1 ] = 0.0
+    return np.concatenate([[0.0], np.cumsum(segments)])
+
+
+def interpolate_lengths(vertices, lengths, targets, first=0, last=None):
+    """Points at the given target lengths, where lengths is the (increasing) length
+    at each vertex. Searches between the vertices first and last (included)"""
+    if last is None:
+        last = vertices.shape[0] - 1
+    i = np.searchsorted(lengths, targets, side='right') - 1
+    i = np.clip(i, first, np.maximum(last - 1, first))
+    span = lengths[i + 1] - lengths[i]
+    t = targets - lengths[i]
+    t = np.divide(t, span, out=np.zeros_like(t), where=(t != 0.0) & (span != 0.0))[:, None]
+    return vertices[i] * (1.0 - t) + vertices[i + 1] * t
+
+
+def resample_path(vertices, offsets, spacing, min_points=2):
+    """Resamples every polyline of a packed buffer with a point every `spacing` units
+    along it (starting at its first vertex). Returns the new (vertices, offsets),
+    keeping only the polylines with at least min_points"""
+    lengths = packed_lengths(vertices, offsets)
+    starts = offsets[:-1]
+    ends = offsets[1:]
+    valid = ends - starts > 1
+    starts = starts[valid]
+    ends = ends[valid]
+
+    totals = lengths[ends - 1] - lengths[starts]
+    counts = np.ceil(totals / spacing).astype(np.intp)
+    keep = counts >= max(min_points, 1)
+    starts, ends, totals, counts = starts[keep], ends[keep], totals[keep], counts[keep]
+
+    new_offsets = np.zeros(counts.shape[0] + 1, dtype=np.intp)
+    np.cumsum(counts, out=new_offsets[1:])
+    if new_offsets[-1] == 0:
+        return np.zeros((0, 2)), new_offsets
+
+    k = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1], counts)
+    targets = np.repeat(lengths[starts], counts) + k * spacing
+    points = interpolate_lengths(vertices, lengths, targets, np.repeat(starts, counts), np.repeat(ends - 1, counts))
+    return points, new_offsets
+
+
+def hatch_path(vertices, offsets, spacing, angle=0.0, inset=0.0):
+    """Scanline fill of the area enclosed by the rings of a packed buffer (even-odd, so
+    the inner rings are holes) with parallel lines `spacing` units apart at `angle` 
+    degrees, shortened by `inset` on both ends. Returns the (vertices, offsets) of the
+    segments in zig-zag order"""
+    a = math.radians(angle)
+    c, s = math.cos(a), math.sin(a)
+
+    # Edge table on a frame where the hatch lines are horizontal (the rings get closed)
+    x = vertices[:, 0] * c + vertices[:, 1] * s
+    y = vertices[:, 1] * c - vertices[:, 0] * s
+    starts = offsets[:-1]
+    ends = offsets[1:]
+    rings = np.flatnonzero(ends - starts > 2)
+    counts = ends[rings] - starts[rings]
+    first = np.repeat(starts[rings], counts)
+    i = first + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    j = np.where(i + 1 < np.repeat(ends[rings], counts), i + 1, first)
+    x0, y0, x1, y1 = x[i], y[i], x[j], y[j]
+
+    empty = (np.zeros((0, 2)), np.zeros(1, dtype=np.intp))
+    if i.shape[0] == 0:
+        return empty
+
+    # Every edge crosses the lines k with y_min <= base + k * spacing < y_max
+    base = y.min() + spacing * 0.5
+    y_lo = np.minimum(y0, y1)
+    y_hi = np.maximum(y0, y1)
+    k_first = np.ceil((y_lo - base) / spacing).astype(np.intp)
+    k_count = np.maximum(np.ceil((y_hi - base) / spacing).astype(np.intp) - k_first, 0)
+    edge = np.repeat(np.arange(i.shape[0]), k_count)
+    if edge.shape[0] == 0:
+        return empty
+    k = np.repeat(k_first, k_count) + np.arange(edge.shape[0]) - np.repeat(np.cumsum(k_count) - k_count, k_count)
+    line_y = base + k * spacing
+    t = (line_y - y0[edge]) / (y1[edge] - y0[edge])
+    line_x = x0[edge] + t * (x1[edge] - x0[edge])
+
+    # Sort the crossings along each line and pair them (inside between 1st and 2nd, 3rd and 4th...)
+    order = np.lexsort((line_x, k))
+    k, line_x, line_y = k[order], line_x[order], line_y[order]
+    group = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+    size = np.diff(np.append(group, k.shape[0]))
+    rank = np.arange(k.shape[0]) - np.repeat(group, size)
+    keep = rank < np.repeat(size - size % 2, size)
+    k, line_x, line_y = k[keep][0::2], line_x[keep].reshape(-1, 2), line_y[keep][0::2]
+
+    line_x[:, 0] += inset
+    line_x[:, 1] -= inset
+    valid = line_x[:, 1] > line_x[:, 0]
+    k, line_x, line_y = k[valid], line_x[valid], line_y[valid]
+
+    # Zig-zag: every other line is drawn backwards (right to left)
+    odd = (k % 2) == 1
+    order = np.lexsort((np.where(odd, -line_x[:, 0], line_x[:, 0]), k))
+    odd, line_x, line_y = odd[order], line_x[order], line_y[order]
+    line_x[odd] = line_x[odd][:, ::-1]
+
+    # Back to the original frame
+    sx = line_x.ravel()
+    sy = np.repeat(line_y, 2)
+    points = np.column_stack([sx * c - sy * s, sx * s + sy * c])
+    return points, np.arange(0, points.shape[0] + 1, 2, dtype=np.intp)
+
+
+_SVG_PATH_TOKEN_RE = re.compile(r"[MmZzLlHhVvCcSsQqTtAa]|[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?")
+_SVG_NUMBER_RE = re.compile(r"[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?")
+_SVG_PATH_ARITY = {'M': 2, 'Z': 0, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7}
+_SVG_PATH_COMMANDS = frozenset('MmZzLlHhVvCcSsQqTtAa')
+_SVG_PATH_SPLIT_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])")
+# The flags of an arc are a single 0 or 1, and minified files drop the space after them (ex: A20 20 0 0150 50)
+_SVG_ARC_ARGS_RE = re.compile(r"[\s,]*(N)[\s,]*(N)[\s,]*(N)[\s,]*([01])[\s,]*([01])[\s,]*(N)[\s,]*(N)".replace('N', _SVG_NUMBER_RE.pattern))
+
+def _svg_path_tokens(d):
+    if 'A' not in d and 'a' not in d:
+        return _SVG_PATH_TOKEN_RE.findall(d)
+
+    # Arcs need their own tokenizer for the flags
+    tokens = []
+    parts = _SVG_PATH_SPLIT_RE.split(d)
+    tokens.extend( _SVG_NUMBER_RE.findall(parts[0]) )
+    for command, text in zip(parts[1::2], parts[2::2]):
+        tokens.append( command )
+        if command in 'Aa':
+            position = 0
+            match = _SVG_ARC_ARGS_RE.match(text, position)
+            while match is not None:
+                tokens.extend( match.groups() )
+                position = match.end()
+                match = _SVG_ARC_ARGS_RE.match(text, position)
+            text = text[position:]
+        tokens.extend( _SVG_NUMBER_RE.findall(text) )
+    return tokens
+
+def _svg_path_runs(args, current, absolute):
+    # Start and (absolute) end points of a run of segments whose last two numbers are the end point
+    ends = args[:, -2:]
+    if not absolute:
+        ends = current + np.cumsum(ends, axis=0)
+    starts = np.vstack([current, ends[:-1]])
+    return starts, ends
+
+
+def _svg_arcs_points(arcs):
+    """Points (but the first) of the SVG elliptical arcs given as rows of 
+    (x0, y0, rx, ry, x_axis_rotation, large_arc, sweep, x1, y1, resolution)
+    See http://www.w3.org/TR/SVG/implnote.html#ArcImplementationNotes"""
+    x0, y0, rx, ry, phi, large, sweep, x1, y1, res = arcs.T
+    rx, ry = np.abs(rx), np.abs(ry)
+    phi = np.radians(phi)
+    cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+    res = res.astype(np.intp)
+
+    # Start on a frame centered between the endpoints and aligned with the axes of the ellipse
+    dx = (x0 - x1) * 0.5
+    dy = (y0 - y1) * 0.5
+    x1p = cos_phi * dx + sin_phi * dy
+    y1p = cos_phi * dy - sin_phi * dx
+
+    # Scale up the radii that are too small to reach both endpoints
+    flat = (rx == 0) | (ry == 0)
+    rx = np.where(flat, 1.0, rx)
+    ry = np.where(flat, 1.0, ry)
+    check = np.sqrt( np.maximum((x1p * x1p) / (rx * rx) + (y1p * y1p) / (ry * ry), 1.0) )
+    rx *= check
+    ry *= check
+
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = np.sqrt( np.maximum(np.divide(num, den, out=np.zeros_like(num), where=den != 0), 0.0) )
+    coef = np.where(large != sweep, coef, -coef)
+    cxp = coef * rx * y1p / ry
+    cyp = -coef * ry * x1p / rx
+    cx = cos_phi * cxp - sin_phi * cyp + (x0 + x1) * 0.5
+    cy = sin_phi * cxp + cos_phi * cyp + (y0 + y1) * 0.5
+
+    theta = np.arctan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    delta = np.arctan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta
+    delta = np.where((sweep == 0) & (delta > 0), delta - 2.0 * math.pi, delta)
+    delta = np.where((sweep != 0) & (delta < 0), delta + 2.0 * math.pi, delta)
+
+    arc = np.repeat(np.arange(arcs.shape[0]), res)
+    t = (np.arange(arc.shape[0]) - np.repeat(np.cumsum(res) - res, res) + 1) / np.repeat(res, res)
+    a = theta[arc] + delta[arc] * t
+    x = cx[arc] + rx[arc] * cos_phi[arc] * np.cos(a) - ry[arc] * sin_phi[arc] * np.sin(a)
+    y = cy[arc] + rx[arc] * sin_phi[arc] * np.cos(a) + ry[arc] * cos_phi[arc] * np.sin(a)
+
+    # Arcs end exactly on their end point (the ones with a zero radius are straight lines to it)
+    drawn = res > 0
+    last = (np.cumsum(res) - 1)[drawn]
+    x[last] = x1[drawn]
+    y[last] = y1[drawn]
+    flat_points = flat[arc]
+    x[flat_points] = x1[arc][flat_points]
+    y[flat_points] = y1[arc][flat_points]
+    return np.column_stack([x, y])
+
+
+def parse_svg_path(d, resolution=100):
+    """Parses SVG path data (the `d` attribute) into packed (vertices, offsets). Curves 
+    are flattened with `resolution` points and arcs with 12 to 180 depending on their 
+    radius (as Arc). The whole string is tokenized at once and every command handles
+    its run of implicit repetitions in bulk. Curves and arcs are evaluated all together at the end"""
+    tokens = _svg_path_tokens(d)
+    empty = (np.zeros((0, 2)), np.zeros(1, dtype=np.intp))
+    if len(tokens) == 0:
+        return empty
+
+    positions = [i for i, token in enumerate(tokens) if token in _SVG_PATH_COMMANDS]
+    if len(positions) == 0 or positions[0] != 0:
+        raise ValueError("Unallowed implicit command in %s" % d[:32])
+
+    numbers = [float(token) for token in tokens if token not in _SVG_PATH_COMMANDS]
+    firsts = [position - i for i, position in enumerate(positions)]
+    lasts = firsts[1:] + [len(numbers)]
+    commands = [tokens[position] for position in positions]
+
+    # Every subpath is a list of pieces: lists of [x, y] points or ('C' | 'A', first, count)
+    # references to the batches of curves and arcs evaluated at the end
+    subpaths = []
+    pieces = None
+    line = None
+    cubics = []
+    n_cubics = 0
+    arcs = []
+    n_arcs = 0
+
+    x, y = 0.0, 0.0
+    start_x, start_y = 0.0, 0.0
+    previous = None
+    control = None
+
+    for command, lo, hi in zip(commands, firsts, lasts):
+        absolute = command.isupper()
+        command = command.upper()
+
+        if command == 'Z':
+            if pieces is not None:
+                if x != start_x or y != start_y:
+                    if line is None:
+                        line = []
+                        pieces.append( line )
+                    line.append( [start_x, start_y] )
+                pieces = None
+                line = None
+            x, y = start_x, start_y
+            previous = command
+            continue
+
+        arity = _SVG_PATH_ARITY[command]
+        n = (hi - lo) // arity
+        if (hi - lo) % arity != 0:
+            warnings.warn('Expected a multiple of {0} values on an SVG path {1} command but got {2}, the last ones are ignored'.format(arity, command, hi - lo))
+        if n == 0:
+            continue
+        args = numbers[lo:lo + n * arity]
+
+        if command == 'M':
+            if absolute:
+                x, y = args[0], args[1]
+            else:
+                x, y = x + args[0], y + args[1]
+            start_x, start_y = x, y
+            line = [[x, y]]
+            pieces = [line]
+            subpaths.append( pieces )
+            command = 'L'
+            args = args[2:]
+            n -= 1
+
+        elif pieces is None:
+            # Drawing without a moveto (ex: after a Z) starts on the current point
+            line = [[x, y]]
+            pieces = [line]
+            subpaths.append( pieces )
+
+        if command in 'LHV':
+            if line is None:
+                line = []
+                pieces.append( line )
+            if command == 'L':
+                for i in range(0, 2 * n, 2):
+                    if absolute:
+                        x, y = args[i], args[i + 1]
+                    else:
+                        x, y = x + args[i], y + args[i + 1]
+                    line.append( [x, y] )
+            elif command == 'H':
+                for v in args:
+                    x = v if absolute else x + v
+                    line.append( [x, y] )
+            else:
+                for v in args:
+                    y = v if absolute else y + v
+                    line.append( [x, y] )
+            previous = command
+            continue
+
+        args = np.array(args).reshape(n, arity)
+        line = None
+
+        if command in 'CSQT':
+            starts, ends = _svg_path_runs(args, [x, y], absolute)
+            offset = 0.0 if absolute else starts[:, None, :]
+
+            if command == 'C':
+                controls = args[:, :4].reshape(n, 2, 2) + offset
+                c1, c2 = controls[:, 0], controls[:, 1]
+                control = c2[-1]
+
+            elif command == 'S':
+                # The first control point is the reflection of the previous second one
+                c2 = args[:, :2] + (0.0 if absolute else starts)
+                c1 = np.empty((n, 2))
+                c1[1:] = 2.0 * starts[1:] - c2[:-1]
+                c1[0] = 2.0 * starts[0] - control if previous in ('C', 'S') else starts[0]
+                control = c2[-1]
+
+            else:
+                if command == 'Q':
+                    q = args[:, :2] + (0.0 if absolute else starts)
+                else:
+                    # The control point is the reflection of the previous one
+                    q = np.empty((n, 2))
+                    last = control if previous in ('Q', 'T') else None
+                    for i in range(n):
+                        q[i] = starts[i] if last is None else 2.0 * starts[i] - last
+                        last = q[i]
+                control = q[-1]
+
+                # Quadratic curves are cubic ones with the controls at 2/3 of the way to q
+                c1 = starts + (q - starts) * (2.0 / 3.0)
+                c2 = ends + (q - ends) * (2.0 / 3.0)
+
+            cubics.append( np.stack([starts, c1, c2, ends], axis=1) )
+            pieces.append( ('C', n_cubics, n) )
+            n_cubics += n
+
+        else:
+            starts, ends = _svg_path_runs(args, [x, y], absolute)
+            res = (12.0 + np.maximum(np.abs(args[:, 0]), np.abs(args[:, 1])) * 168.0 / 180.0).astype(np.intp)
+            res = np.where(np.all(starts == ends, axis=1), 0, res)
+            res = np.where((args[:, 0] == 0) | (args[:, 1] == 0), np.minimum(res, 1), res)
+            arcs.append( np.column_stack([starts, args[:, :5], ends, res]) )
+            pieces.append( ('A', n_arcs, n) )
+            n_arcs += n
+
+        x, y = ends[-1].tolist()
+        previous = command
+
+    # Evaluate all curves and arcs at once
+    if n_cubics > 0:
+        P0, P1, P2, P3 = np.concatenate(cubics)[:, :, None, :].transpose(1, 0, 2, 3)
+        t = (np.arange(1, resolution + 1) / float(resolution))[None, :, None]
+        cubics = P0 + t * (3 * (P1 - P0) + t * (3 * (P0 + P2) - 6 * P1 + t * (-P0 + 3 * (P1 - P2) + P3)))
+
+    if n_arcs > 0:
+        arcs = np.concatenate(arcs)
+        counts = arcs[:, -1].astype(np.intp)
+        arcs_start = np.zeros(counts.shape[0] + 1, dtype=np.intp)
+        np.cumsum(counts, out=arcs_start[1:])
+        arcs_points = _svg_arcs_points(arcs)
+
+    polylines = []
+    for pieces in subpaths:
+        if len(pieces) == 1:
+            points = pieces[0]
+        else:
+            points = []
+            for piece in pieces:
+                if isinstance(piece, tuple):
+                    kind, first, n = piece
+                    if kind == 'C':
+                        piece = cubics[first:first + n].reshape(-1, 2)
+                    else:
+                        piece = arcs_points[arcs_start[first]:arcs_start[first + n]]
+                points.append( np.asarray(piece, dtype=float).reshape(-1, 2) )
+            points = np.concatenate(points)
+        if len(points) > 1:
+            polylines.append(points)
+
+    if len(polylines) == 0:
+        return empty
+    return pack_path(polylines)
+
+
 def join_path(path, tolerance):
     if len(path) < 2:
         return path
@@ -233,9 +653,48 @@ def pointInside( pos, points ):
                         if p1[0] == p2[0] or pos[0] <= xinters:
                             counter += 1
         p1 = p2
-        
+
     return counter % 2 != 0
 
+
+def pointsInside( pos, points ):
+    """Same crossing number test of pointInside() for a (N, 2) array of positions at once.
+    Returns a (N,) boolean array (positions with NaNs are never inside)"""
+    pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+    result = np.zeros(pos.shape[0], dtype=bool)
+
+    points = np.asarray(points, dtype=float)
+    if points.shape[0] == 0 or pos.shape[0] == 0:
+        return result
+    points = points.reshape(points.shape[0], -1)[:, :2]
+
+    # Sorting by Y each edge only needs to look at the positions between its ends
+    order = np.argsort(pos[:, 1], kind='stable')
+    xs = pos[order, 0]
+    ys = pos[order, 1]
+    inside = np.zeros(pos.shape[0], dtype=bool)
+
+    P1 = points
+    P2 = np.roll(points, -1, axis=0)
+    y_min = np.minimum(P1[:, 1], P2[:, 1])
+    y_max = np.maximum(P1[:, 1], P2[:, 1])
+    lo = np.searchsorted(ys, y_min, side='right')
+    hi = np.searchsorted(ys, y_max, side='right')
+
+    for i in np.flatnonzero(hi > lo).tolist():
+        x1, y1 = P1[i]
+        x2, y2 = P2[i]
+        a, b = lo[i], hi[i]
+        x = xs[a:b]
+        crossing = x <= max(x1, x2)
+        if x1 != x2:
+            xinters = (ys[a:b] - y1) * (x2 - x1) / (y2 - y1) + x1
+            crossing &= x <= xinters
+        inside[a:b] ^= crossing
+
+    result[order] = inside
+    return result
+
 # https://github.com/openframeworks/openFrameworks/blob/master/libs/openFrameworks/math/ofMath.h#L435
 def linesIntersection(line1Start, line1End, line2Start, line2End):
     intersection = [0.0, 0.0]
@@ -263,6 +722,48 @@ def dom2dict(element):
     return dict(list(zip(keys, values)))
 
 
+def svg_shape_path(tag, att):
+    """Path data (the `d` attribute) equivalent to an SVG shape element given its 
+    tag (without namespace) and dictionary of attributes. None for other elements"""
+    def get(key):
+        # lengths may come with units (ignored)
+        number = _SVG_NUMBER_RE.match(str(att.get(key, '0')).strip())
+        return float(number.group(0)) if number else 0.0
+
+    if tag == 'path':
+        return att.get('d', '')
+
+    elif tag == 'polyline' or tag == 'polygon':
+        points = att.get('points', '').strip()
+        if not points:
+            return ''
+        return 'M' + points + ('Z' if tag == 'polygon' else '')
+
+    elif tag == 'line':
+        return 'M%r %rL%r %r' % (get('x1'), get('y1'), get('x2'), get('y2'))
+
+    elif tag == 'rect':
+        x, y, w, h = get('x'), get('y'), get('width'), get('height')
+        return 'M%r %rh%rv%rh%rZ' % (x, y, w, h, -w)
+
+    elif tag == 'circle' or tag == 'ellipse':
+        cx, cy = get('cx'), get('cy')
+        if tag == 'circle':
+            rx = ry = get('r')
+        else:
+            rx, ry = get('rx'), get('ry')
+        return 'M%r %rA%r %r 0 1 0 %r %rA%r %r 0 1 0 %r %rZ' % (cx - rx, cy, rx, ry, cx + rx, cy, rx, ry, cx - rx, cy)
+
+    return None
+
+
+def _check_num_parsed_values(values, allowed):
+    if len(values) not in allowed:
+        warnings.warn('Expected {0} values on an SVG transform but got {1}'.format(allowed, len(values)))
+        return False
+    return True
+
+
 #  From Andy Port's svgpathtools 
 # https://github.com/mathandy/svgpathtools/blob/master/svgpathtools/parser.py#L221
 # 
@@ -332,6 +833,17 @@ def _parse_transform_substr(transform_substr):
     return transform
 
 
+def parse_transform_matrix(transform_str):
+    """Converts an SVG transform attribute into a 3x3 matrix (identity if it's empty)"""
+    matrix = np.identity(3)
+    if not transform_str:
+        return matrix
+
+    for transform_substr in transform_str.split(')')[:-1]:
+        matrix = matrix.dot( _parse_transform_substr(transform_substr.strip(' ,\t\n')) )
+    return matrix
+
+
 def parse_transform(el, transform_str):
     """Converts a valid SVG transformation string into a 3x3 matrix.
     If the string is empty or null, this returns a 3x3 identity matrix"""
@@ -31,6 +31,7 @@ setup(
     include_package_data=True,
     package_data={
         'Surface': ['*.py'],
+        'berthe': ['*.npz'],
     },
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -0,0 +1,31 @@
+from berthe import Surface, Rectangle
+
+
+def test_bounds_follow_translate_edited_in_place():
+    surface = Surface()
+    group = surface.group('g')
+    circle = group.circle([10, 10], 2)
+    assert circle.bounds.limits == (8.0, 8.0, 12.0, 12.0)
+    assert surface.bounds.limits == (8.0, 8.0, 12.0, 12.0)
+    assert surface.elementsAt([10, 10], deep=True) == [circle]
+
+    circle.translate[0] += 100
+    assert circle.bounds.limits == (108.0, 8.0, 112.0, 12.0)
+    assert group.bounds.limits == (108.0, 8.0, 112.0, 12.0)
+    assert surface.bounds.limits == (108.0, 8.0, 112.0, 12.0)
+    assert surface.elementsAt([10, 10], deep=True) == []
+    assert surface.elementsAt([110, 10], deep=True) == [circle]
+
+    translate = circle.translate
+    translate += 10
+    assert surface.bounds.limits == (118.0, 18.0, 122.0, 22.0)
+
+
+def test_bounds_follow_scale_edited_in_place():
+    surface = Surface()
+    rect = surface.add( Rectangle([0, 0], [2, 2], scale=[1, 1]) )
+    assert surface.bounds.width == 2.0
+
+    rect.scale[0] = 10
+    assert rect.bounds.width == 20.0
+    assert surface.bounds.width == 20.0
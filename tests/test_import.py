@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import berthe
+elapsed = time.perf_counter() - start
+loaded = [ name for name in ('berthe.hershey_fonts', 'berthe.convert', 'shapely', 'PIL') if name in sys.modules ]
+berthe.FUTURAL
+print(json.dumps({ 'elapsed': elapsed, 'loaded': loaded, 'fonts': 'berthe.hershey_fonts' in sys.modules }))
+'''
+
+
+def test_import_time():
+    # On a fresh interpreter, so nothing is loaded yet
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT], cwd=ROOT)
+    result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+    assert result['loaded'] == []
+    assert result['fonts']
+    assert result['elapsed'] < 1.0
+
+
+def test_classes_stay_on_the_package():
+    # Submodules imported later (from code or by hand) don't shadow the classes
+    import numpy as np
+    import berthe
+    from berthe.Group import Group
+
+    surface = berthe.Surface()
+    surface.pattern( (np.linspace(0, 1, 10), np.linspace(0, 1, 10)) )
+    assert isinstance(berthe.Pattern, type)
+    assert isinstance(berthe.Pattern( (np.zeros(3), np.zeros(3)) ), berthe.Pattern)
+    assert isinstance(berthe.Polyline([[0, 0], [1, 1]]), berthe.Element)
+    assert berthe.Group is Group
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+
+from berthe.Index import Index, nearest_neighbours
+
+
+def brute_nearest(points, alive, point):
+    dist = np.hypot(points[:, 0] - point[0], points[:, 1] - point[1])
+    dist[~alive] = np.inf
+    return dist.min()
+
+
+def test_nearest_with_removals():
+    rng = np.random.default_rng(0)
+    points = rng.random((500, 2)) * 100
+    index = Index(points)
+    alive = np.ones(points.shape[0], dtype=bool)
+    for i in range(points.shape[0]):
+        query = rng.random(2) * 100
+        handle = index.nearest(query)
+        assert np.hypot(*(points[handle] - query)) == brute_nearest(points, alive, query)
+        index.remove(handle)
+        alive[handle] = False
+    assert index.nearest([0, 0]) is None
+
+
+def test_nearest_on_skewed_points():
+    # Points along a diagonal, the worst case for cells placed on each axis on its own
+    rng = np.random.default_rng(1)
+    t = rng.random(100000) * 1000
+    points = np.stack([t, t], axis=1) + rng.normal(0, 0.01, (100000, 2))
+    index = Index(points)
+    alive = np.ones(points.shape[0], dtype=bool)
+
+    queries = points[ rng.integers(0, points.shape[0], 2000) ] + rng.normal(0, 1, (2000, 2))
+    start = time.time()
+    found = [ index.nearest(query) for query in queries ]
+    assert time.time() - start < 2.0
+
+    for query, handle in zip(queries[:50], found[:50]):
+        assert np.hypot(*(points[handle] - query)) == brute_nearest(points, alive, query)
+
+
+def test_nearest_neighbours():
+    rng = np.random.default_rng(2)
+    points = rng.random((2000, 2))
+    found = nearest_neighbours(points, 8)
+    assert found.shape == (2000, 8)
+    assert (found != np.arange(2000)[:, None]).all()
+
+    dist = np.hypot(points[:, None, 0] - points[None, :, 0], points[:, None, 1] - points[None, :, 1])
+    np.fill_diagonal(dist, np.inf)
+    assert np.mean(found[:, 0] == dist.argmin(axis=1)) > 0.95
@@ -0,0 +1,39 @@
+import time
+
+import numpy as np
+
+from berthe.Path import Path
+from berthe.optimize import optimize_travel, travel_length
+
+
+def random_strokes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = rng.random((n, 2)) * 1000
+    ends = starts + rng.normal(0, 1, (n, 2))
+    return starts, ends
+
+
+def test_optimize_travel_lengths():
+    starts, ends = random_strokes(2000)
+    order, reverse, before, after = optimize_travel(starts, ends, time_budget=10)
+    assert sorted(order.tolist()) == list(range(2000))
+    assert order[0] == 0
+    assert before == travel_length(starts, ends)
+    assert np.isclose(after, travel_length(starts, ends, order, reverse))
+    assert after < before
+
+
+def test_optimize_travel_budget_includes_setup():
+    starts, ends = random_strokes(100000)
+    start = time.time()
+    optimize_travel(starts, ends, time_budget=1.0)
+    assert time.time() - start < 2.0
+
+
+def test_get_optimized_lengths():
+    starts, ends = random_strokes(500)
+    path = Path(vertices=np.stack([starts, ends], axis=1).reshape(-1, 2), offsets=np.arange(0, 1001, 2))
+    optimized, (original, sorted_length, optimized_length) = path.getOptimized(time_budget=5, return_lengths=True)
+    assert original == path.up_length
+    assert np.isclose(optimized_length, optimized.up_length)
+    assert optimized_length <= sorted_length < original
@@ -0,0 +1,40 @@
+import numpy as np
+
+from berthe.Path import Path
+from berthe.Polyline import Polyline
+
+
+def test_split_by_length_on_vertices():
+    square = Path([ [[0, 0], [1, 0], [1, 1], [0, 1], [0, 0]] ])
+    pieces = square.splitByLength(1)
+    assert [ piece.getPoints() for piece in pieces ] == [
+        [[0.0, 0.0], [1.0, 0.0]],
+        [[1.0, 0.0], [1.0, 1.0]],
+        [[1.0, 1.0], [0.0, 1.0]],
+        [[0.0, 1.0], [0.0, 0.0]] ]
+
+
+def test_split_by_length_inside_segments():
+    path = Path([ [[0, 0], [1, 0], [1, 1]], [[5, 5], [5, 7]] ])
+    pieces = path.splitByLength(1.5)
+    assert all( piece.down_length <= 1.5 + 1e-9 for piece in pieces )
+    assert np.isclose( sum(piece.down_length for piece in pieces), path.down_length )
+    assert pieces[0].getPoints() == [[0.0, 0.0], [1.0, 0.0], [1.0, 0.5]]
+    assert pieces[1].getPoints()[0] == [1.0, 0.5]
+
+
+def test_resampled_by_spacing():
+    path = Path([ [[0, 0], [10, 0]], [[0, 5], [0, 10]] ])
+    resampled = path.getResampledBySpacing(1.0, color='red')
+    assert resampled.color == 'red'
+    expected = Polyline([[0, 0], [10, 0]]).getResampledBySpacing(1.0).points + Polyline([[0, 5], [0, 10]]).getResampledBySpacing(1.0).points
+    assert resampled.getPoints() == expected
+
+
+def test_resampled_by_spacing_not_positive():
+    path = Path([ [[0, 0], [10, 0]] ])
+    assert path.getResampledBySpacing(0) is path
+    assert path.getResampledBySpacing(-1) is path
+
+    polyline = Polyline([[0, 0], [10, 0]])
+    assert polyline.getResampledBySpacing(-1) is polyline
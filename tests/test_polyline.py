@@ -0,0 +1,18 @@
+from berthe.Polyline import Polyline
+
+
+def test_get_path_cached_after_normals():
+    polyline = Polyline([[0, 0], [10, 0], [10, 10]])
+    path = polyline.getPath()
+    polyline.getNormalAtIndex(1)
+    polyline.getTangentAtIndex(1)
+    assert polyline.getPath() is path
+
+
+def test_get_path_dropped_when_dirty():
+    polyline = Polyline([[0, 0], [10, 0], [10, 10]])
+    path = polyline.getPath()
+    polyline.points.append([0, 10])
+    polyline.dirty = True
+    assert polyline.getPath() is not path
+    assert len(polyline.getPath().getPoints()) == 4
@@ -0,0 +1,21 @@
+import io
+
+import numpy as np
+
+from berthe import Surface
+
+SVG = b'''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 200 100">
+  <circle cx="100" cy="50" r="40"/>
+</svg>'''
+
+
+def test_from_svg_keeps_aspect_ratio():
+    surface = Surface()
+    surface.fromSVG( io.BytesIO(SVG) )
+    bounds = surface.bounds
+    assert np.isclose(bounds.width, bounds.height, rtol=1e-3)
+
+    # Fitted (meet) and centered on the surface
+    scale = min(surface.width / 200.0, surface.height / 100.0)
+    assert np.isclose(bounds.width, 80 * scale, rtol=1e-3)
+    assert np.allclose(bounds.center, [surface.width * 0.5, surface.height * 0.5], atol=1e-2)
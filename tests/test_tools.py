@@ -0,0 +1,27 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from berthe.tools import parse_svg_path
+
+
+def test_parse_svg_path_compact_arc_flags():
+    compact, compact_offsets = parse_svg_path('M10 10 A20 20 0 0150 50')
+    spaced, spaced_offsets = parse_svg_path('M10 10 A20 20 0 0 1 50 50')
+    assert compact.shape[0] > 2
+    assert np.array_equal(compact, spaced)
+    assert np.array_equal(compact_offsets, spaced_offsets)
+
+    repeated, _ = parse_svg_path('M10,10a20,20,0,1,0,40,40 20 20 0 1040-40')
+    assert np.allclose(repeated[-1], [90, 10])
+
+
+def test_parse_svg_path_warns_on_missing_values():
+    with pytest.warns(UserWarning):
+        vertices, offsets = parse_svg_path('M0 0 L10 10 20')
+    assert vertices.tolist() == [[0.0, 0.0], [10.0, 10.0]]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        parse_svg_path('M0 0 L10 10 20 20 Z')